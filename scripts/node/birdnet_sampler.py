@@ -19,6 +19,8 @@ import time
 from confidence_manager import bin_confidence
 
 class BirdDetectionEvent:
+    __slots__ = ("event_type", "common_name", "time", "confidence_bin", "target")
+
     def __init__(self, event_type: str, common_name: str, timestamp: int, confidence_bin: int, target: str = "send_over_lora"):
         self.event_type     = event_type
         self.common_name    = common_name
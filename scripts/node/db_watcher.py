@@ -9,16 +9,20 @@ whenever the detections table is updated with a new row.
 This module is intended to be used by dispatcher.py as part of the EnviroPulse event loop.
 
 Behavior:
-- Watches birds.db for changes on disk
-- On modification, queries the most recent rowid
-- Ignores duplicate rowids to prevent reprocessing the same detection
-- Delays briefly to allow SQLite to finish writing before querying
-- Executes a user-provided callback function when a new row appears
+- Watches birds.db and its -wal / -journal files for changes on disk
+- Debounces filesystem events: one BirdNET insert fires several events
+  (db, -wal, -journal), so a change is only examined once no further
+  event arrived for DEBOUNCE_SEC (or DEBOUNCE_MAX_SEC after the first one,
+  so a steady stream of writes still gets through)
+- Confirms a real commit with PRAGMA data_version on one long-lived
+  read-only connection, which only changes when another connection has
+  committed; the callback runs exactly once per confirmed change
+- The callback reads new rows itself (DetectionReader.read_new)
 
 Notes:
 - Database path is hardcoded to: /home/FLC/BirdNET-Pi/scripts/birds.db
 - Uses watchdog for efficient event monitoring
-- This module does not return the full detection; just signals a new entry
+- This module does not read detections; it just signals a change
 - Detection parsing is handled by detection_extractor.py
 
 To use:
@@ -30,52 +34,90 @@ To use:
     observer = start_db_watch(on_new_detection)
 """
 
+import sqlite3
+import threading
 import time
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
 DB_PATH = Path("/home/node1/BirdNET-Pi/scripts/birds.db")
+DEBOUNCE_SEC = 0.2
+DEBOUNCE_MAX_SEC = 1.0
 
 class DBChangeHandler(FileSystemEventHandler):
-    def __init__(self, callback):
+    def __init__(self, callback, db_path: Path = DB_PATH, debounce: float = DEBOUNCE_SEC):
         super().__init__()
         self.callback = callback
-        self.last_rowid = None
-
-    def on_modified(self, event):
-        if Path(event.src_path) != DB_PATH:
+        self.db_path = Path(db_path)
+        self.debounce = debounce
+        self._watched = {str(self.db_path), f"{self.db_path}-wal", f"{self.db_path}-journal"}
+        self._cond = threading.Condition()
+        self._first_event = None    # monotonic time of the first event in this burst
+        self._last_event = None
+        self._conn = None
+        self._data_version = self._read_data_version()
+        self.events_seen = 0
+        self.changes = 0
+        self._thread = threading.Thread(target=self._debounce_loop, name="db-watch", daemon=True)
+        self._thread.start()
+
+    def on_any_event(self, event):
+        if event.is_directory or event.src_path not in self._watched:
             return
-
-        time.sleep(0.1)  # let SQLite finish writing
-
+        now = time.monotonic()
+        with self._cond:
+            self.events_seen += 1
+            if self._first_event is None:
+                self._first_event = now
+            self._last_event = now
+            self._cond.notify()
+
+    def _debounce_loop(self):
+        while True:
+            with self._cond:
+                while self._first_event is None:
+                    self._cond.wait()
+                while True:
+                    now = time.monotonic()
+                    deadline = min(self._last_event + self.debounce,
+                                   self._first_event + DEBOUNCE_MAX_SEC)
+                    if now >= deadline:
+                        break
+                    self._cond.wait(deadline - now)
+                self._first_event = self._last_event = None
+
+            if self._changed():
+                self.changes += 1
+                try:
+                    self.callback()
+                except Exception as e:
+                    print(f"[WARN] DB change callback failed: {e}")
+
+    def _read_data_version(self):
         try:
-            import sqlite3
-            conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True, timeout=5)
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-
-            cur.execute('''
-                SELECT rowid FROM detections
-                 ORDER BY rowid DESC
-                 LIMIT 1
-            ''')
-            row = cur.fetchone()
-            conn.close()
-
-            if not row:
-                return
-
-            # skip duplicates
-            if row['rowid'] == self.last_rowid:
-                return
-            self.last_rowid = row['rowid']
-
-            # trigger user-defined callback
-            self.callback()
-
-        except sqlite3.OperationalError as e:
+            if self._conn is None:
+                self._conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True, timeout=5,
+                                             check_same_thread=False)
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error as e:
             print(f"[WARN] DB locked or unavailable: {e}")
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except sqlite3.Error:
+                    pass
+                self._conn = None
+            return None
+
+    def _changed(self) -> bool:
+        """True if another connection committed since the last check."""
+        version = self._read_data_version()
+        if version is None:
+            return True     # cannot tell: let the reader look
+        changed = version != self._data_version
+        self._data_version = version
+        return changed
 
 def start_db_watch(callback):
     observer = Observer()
@@ -83,4 +125,4 @@ def start_db_watch(callback):
     observer.schedule(handler, str(DB_PATH.parent), recursive=False)
     observer.start()
     print(f"Watching {DB_PATH} for changes...")
-    return observer  # caller should `.stop()` and `.join()` on shutdown
\ No newline at end of file
+    return observer  # caller should `.stop()` and `.join()` on shutdown
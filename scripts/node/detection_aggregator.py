@@ -0,0 +1,127 @@
+"""
+detection_aggregator.py
+-----------------------
+
+Windowed aggregation of BirdNET detections between
+BirdDetectionEvent.from_row() and dispatch_event().
+
+BirdNET-Pi often writes the same species many times a minute; sending
+each row as its own avis_event spends airtime on repeats. Detections are
+collected over a tumbling window (AGGREGATION_WINDOW_SEC, opened by the
+first detection) and collapsed per species:
+
+- a species seen once is emitted unchanged as its avis_event
+- a species seen several times becomes one avis_summary_event carrying
+  the first-seen time, the maximum confidence bin and the count
+  (saturating at 255)
+- optionally (TOP_K) only the K species with the most detections (ties:
+  higher confidence) are emitted per window; the rest are counted in
+  stats() as suppressed
+
+The window is flushed from a timer thread. `lock` (shared with the
+detection reader in dispatcher.py) is held while adding and flushing, and
+safe_rowid() tells the caller which BirdNET rowid may be checkpointed:
+nothing still held in an open window is ever marked as handled.
+
+Usage:
+    agg = DetectionAggregator(emit=lambda events: ..., lock=threading.RLock())
+    agg.add(BirdDetectionEvent.from_row(row).to_dict(), row["rowid"])
+    agg.flush()                       # on shutdown
+"""
+
+import threading
+
+
+AGGREGATION_WINDOW_SEC = 60
+TOP_K = None               # e.g. 3 to keep only the three most frequent species per window
+MAX_COUNT = 255
+
+
+class _SpeciesWindow:
+    __slots__ = ("first", "count", "max_confidence")
+
+    def __init__(self, event: dict):
+        self.first = event
+        self.count = 1
+        self.max_confidence = event["confidence"]
+
+    def add(self, event: dict):
+        self.count += 1
+        self.max_confidence = max(self.max_confidence, event["confidence"])
+        if event["timestamp"] < self.first["timestamp"]:
+            self.first = event
+
+    def to_event(self) -> dict:
+        if self.count == 1:
+            return self.first
+        return {
+            **self.first,
+            "event_type": "avis_summary_event",
+            "confidence": self.max_confidence,
+            "count": min(self.count, MAX_COUNT),
+        }
+
+
+class DetectionAggregator:
+    def __init__(self, emit, lock=None, window_sec: float = AGGREGATION_WINDOW_SEC, top_k: int = TOP_K):
+        self.emit = emit            # emit(list of event dicts)
+        self.window_sec = window_sec
+        self.top_k = top_k
+        self._lock = lock if lock is not None else threading.RLock()
+        self._species = {}          # common_name → _SpeciesWindow
+        self._min_rowid = None      # oldest BirdNET rowid held in the open window
+        self._timer = None
+        self.windows = 0
+        self.detections = 0
+        self.emitted = 0
+        self.suppressed = 0
+
+    def add(self, event: dict, rowid: int = None):
+        """Adds one avis_event to the open window (opening one if needed)."""
+        with self._lock:
+            self.detections += 1
+            window = self._species.get(event["common_name"])
+            if window is None:
+                self._species[event["common_name"]] = _SpeciesWindow(event)
+            else:
+                window.add(event)
+            if rowid is not None and self._min_rowid is None:
+                self._min_rowid = rowid
+            if self._timer is None:
+                self._timer = threading.Timer(self.window_sec, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Closes the open window and emits its events (oldest first)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._species:
+                return
+            windows = sorted(self._species.values(), key=lambda w: (-w.count, -w.max_confidence))
+            if self.top_k is not None:
+                self.suppressed += sum(w.count for w in windows[self.top_k:])
+                windows = windows[:self.top_k]
+            events = sorted((w.to_event() for w in windows), key=lambda e: e["timestamp"])
+            self._species = {}
+            self._min_rowid = None
+            self.windows += 1
+            self.emitted += len(events)
+            self.emit(events)
+
+    def safe_rowid(self, last_read_rowid: int) -> int:
+        """Highest rowid whose detection has left the aggregator."""
+        with self._lock:
+            if self._min_rowid is None:
+                return last_read_rowid
+            return self._min_rowid - 1
+
+    def stats(self) -> dict:
+        return {
+            "windows": self.windows,
+            "detections": self.detections,
+            "emitted": self.emitted,
+            "suppressed": self.suppressed,
+        }
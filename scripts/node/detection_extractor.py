@@ -2,10 +2,32 @@
 detection_extractor.py
 ----------------------
 
-Queries BirdNET-Pi’s SQLite database and retrieves the latest detection
-from the 'detections' table.
+Queries BirdNET-Pi’s SQLite database and retrieves detections from the
+'detections' table.
 
-Returns:
+DetectionReader (used by the dispatcher):
+- Keeps one read-only connection open for the process lifetime
+- read_new() returns every row with rowid > the last one it returned, in
+  insertion order, in a single query, so several detections written from
+  one recording are all delivered (as a batch) instead of only the last
+- The cursor only advances past rows that were actually returned; if the
+  DB is locked, the rows are picked up by the next read
+- The starting rowid is resolved lazily, on the first read that can see the
+  table (optionally through a `start(max_rowid)` callback such as
+  DetectionCursor.catch_up_start); a missing or unreadable birds.db at
+  startup is never mistaken for an empty table
+
+DetectionCursor:
+- Checkpoints the last handled rowid to EP/data/detection_cursor.json,
+  atomically (temp file + fsync + rename), so a restart resumes exactly
+  where the previous process stopped
+- catch_up_start() bounds how far back a restart reaches
+  (CATCHUP_MAX_ROWS), so a long outage cannot flood the uplink; it is
+  applied when the reader first sees the table, and nothing is saved
+  before that, so a birds.db that is unreadable at startup can neither
+  overwrite the checkpoint nor bypass the bound
+
+get_latest_detection() (legacy, single newest row):
     A dictionary with the latest row fields:
       - Date
       - Time
@@ -17,16 +39,135 @@ Returns:
 Returns None if the DB is locked or no row is found.
 
 Usage:
-    from detection_extractor import get_latest_detection
-    row = get_latest_detection()
+    from detection_extractor import DetectionReader
+    cursor = DetectionCursor()
+    reader = DetectionReader(start=cursor.catch_up_start)
+    for row in reader.read_new():       # dicts as above, plus "rowid"
+        ...
+    cursor.save(reader.last_rowid)
 """
 
+import json
 import sqlite3
 import time
 import os
 from pathlib import Path
 
 DB_PATH = Path.home() / "BirdNET-Pi" / "scripts" / "birds.db"
+BATCH_LIMIT = 500          # rows per query; larger backlogs take several reads
+CURSOR_PATH = Path(__file__).resolve().parent.parent.parent / "data" / "detection_cursor.json"
+CATCHUP_MAX_ROWS = 1000    # most rows a restart will resend from before it started
+
+DETECTION_COLUMNS = "rowid, Date, Time, Com_Name, Sci_Name, Confidence, File_Name"
+
+
+class DetectionReader:
+    def __init__(self, db_path: Path = DB_PATH, last_rowid: int = None, start=None):
+        self.db_path = Path(db_path)
+        self._conn = None
+        self._start = start            # start(max_rowid) → rowid to resume after
+        self.last_rowid = last_rowid   # None until resolved by the first successful read
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if not self.db_path.exists():
+                raise sqlite3.OperationalError("Database file not found.")
+            self._conn = sqlite3.connect(
+                f"file:{self.db_path}?mode=ro", uri=True, timeout=5, check_same_thread=False
+            )
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+
+    def _reset(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+            self._conn = None
+
+    def max_rowid(self):
+        """Newest rowid in the detections table: 0 if empty, None if unreadable."""
+        try:
+            row = self._connect().execute("SELECT MAX(rowid) FROM detections").fetchone()
+            return row[0] or 0
+        except sqlite3.Error as e:
+            print(f"[WARN] [detection_extractor] Cannot read max rowid: {e}")
+            self._reset()
+            return None
+
+    def _resolve_start(self) -> bool:
+        """Sets last_rowid on the first readable look at the table."""
+        max_rowid = self.max_rowid()
+        if max_rowid is None:
+            return False
+        self.last_rowid = self._start(max_rowid) if self._start else max_rowid
+        return True
+
+    def read_new(self, limit: int = BATCH_LIMIT) -> list:
+        """All rows inserted since the last call, oldest first (up to `limit`)."""
+        if self.last_rowid is None and not self._resolve_start():
+            return []
+        try:
+            rows = self._connect().execute(
+                f"SELECT {DETECTION_COLUMNS} FROM detections WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (self.last_rowid, limit)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"[WARN] [detection_extractor] Batch read failed: {e}")
+            self._reset()
+            return []
+        if rows:
+            self.last_rowid = rows[-1]["rowid"]
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self._reset()
+
+
+class DetectionCursor:
+    def __init__(self, path: Path = CURSOR_PATH):
+        self.path = Path(path)
+
+    def load(self):
+        """The checkpointed rowid, or None if there is no (valid) checkpoint."""
+        try:
+            return int(json.loads(self.path.read_text())["rowid"])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"[WARN] [detection_extractor] Ignoring bad cursor file: {e}")
+            return None
+
+    def save(self, rowid: int):
+        """Atomically replaces the checkpoint with `rowid`."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"rowid": rowid, "saved_at": int(time.time())}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def catch_up_start(self, max_rowid, max_rows: int = CATCHUP_MAX_ROWS):
+        """
+        Rowid to resume after: the checkpoint, but no more than max_rows
+        behind the newest row. Without a checkpoint, starts at the newest row.
+        If max_rowid is unknown (None: birds.db unreadable), the checkpoint is
+        kept as is; only a readable table whose newest row is below the
+        checkpoint counts as a recreated birds.db.
+        """
+        saved = self.load()
+        if max_rowid is None:
+            return saved
+        if saved is None or saved > max_rowid:
+            return max_rowid        # first run, or birds.db was recreated
+        start = max(saved, max_rowid - max_rows)
+        if start > saved:
+            print(f"[WARN] [detection_extractor] Skipping {start - saved} detections "
+                  f"older than the last {max_rows}")
+        return start
+
 
 def get_latest_detection():
     time.sleep(0.5)  # Give SQLite time to flush after fs event
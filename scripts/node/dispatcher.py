@@ -3,72 +3,127 @@ dispatcher.py
 -------------
 Main controller for EnviroPulse runtime system.
 
-- Reacts to new BirdNET detections using a DB file watcher
-- Periodically samples weather and telemetry
-- Routes all structured event dictionaries to the correct destination
-  via their 'target' field, such as 'send_over_lora'
+- Reacts to new BirdNET detections using a DB file watcher, reading every
+  row inserted since the last read as one batch (no detection is skipped
+  when one recording yields several rows)
+- Checkpoints the last handled detection rowid to disk once the batch is in
+  the durable outbox, and on startup catches up on detections made while
+  the dispatcher was down (bounded by CATCHUP_MAX_ROWS)
+- Optionally (AGGREGATION_ENABLED) collapses repeated detections of a
+  species over a window into one avis_summary_event (detection_aggregator)
+- Periodically samples weather and telemetry on drift-free fixed-rate
+  schedules (task_scheduler: heap of deadlines, concurrent samplers with
+  timeouts, no idle wakeups), sending a sample only when
+  it left its deadband or the maximum silence expired (reporting_policy);
+  suppressed samples are kept locally
+- Runs every event through the pipeline for its event type
+  (event_pipeline: validate, confidence filter, reporting policy,
+  aggregate, optional rate-limit, trial encode, route), which finally routes it
+  via its 'target' field, such as 'send_over_lora'
 
 Supported event types:
 - avis_event        (BirdNET)
+- avis_summary_event (BirdNET, several detections of one species per window)
 - weather_event     (BMP390 + SHT31)
 - telemetry_event   (Averaged GPS fix)
 - birdnet_error     (fallback)
 
 Targets:
-- send_over_lora → transmit using Protocol + RUI3Driver
+- send_over_lora → queue for the RadioService writer (Protocol + RUI3Driver)
 - log_only       → log to terminal
 - noop           → ignore silently
 """
 
-import time
 import signal
 import sys
+import threading
 
 from db_watcher import start_db_watch
-from detection_extractor import get_latest_detection
+from detection_extractor import DetectionReader, DetectionCursor, BATCH_LIMIT
 from birdnet_sampler import BirdDetectionEvent
+from detection_aggregator import DetectionAggregator
 from weather_sampler import WeatherEvent
 from telemetry_sampler import TelemetryEvent
-from send_over_lora import send_event_over_lora
+from gps_service import get_gps_service
+from gps_calibrator import get_position_estimator
+from sensor_manager import get_sensor_manager
+from reporting_policy import close_reporting
+from event_pipeline import build_pipelines
+from radio_service import get_radio_service
+from task_scheduler import TaskScheduler
 
-running = True
+AGGREGATION_ENABLED = True
+
+WEATHER_INTERVAL_SEC = 5 * 60
+TELEMETRY_INTERVAL_SEC = 5 * 60
+SAMPLE_TIMEOUT_SEC = 60
+
+scheduler = TaskScheduler()
+detection_reader = None
+detection_cursor = DetectionCursor()
+detection_lock = threading.RLock()   # watcher thread vs. catch-up vs. aggregation flush
 
 def handle_shutdown(sig, frame):
-    global running
     print("Shutdown signal received.")
-    running = False
+    scheduler.stop()
+
+def dispatch_events(events: list):
+    """Runs events through their event type's pipeline, batching consecutive events of one type."""
+    batch, batch_type = [], None
+    for event in events:
+        if not isinstance(event, dict):
+            print("[ERROR] Non-dict event received. Skipping.")
+            continue
+        if batch and event.get("event_type") != batch_type:
+            pipelines.get(batch_type, pipelines[None]).run(batch)
+            batch = []
+        batch_type = event.get("event_type")
+        batch.append(event)
+    if batch:
+        pipelines.get(batch_type, pipelines[None]).run(batch)
 
 def dispatch_event(event: dict):
-    """Routes an event dictionary based on its 'target' field."""
-    if not isinstance(event, dict):
-        print("[ERROR] Non-dict event received. Skipping.")
-        return
-
-    target = event.get("target", "noop")
-    event_type = event.get("event_type", "unknown")
-
-    if event_type not in {"avis_event", "weather_event", "telemetry_event", "birdnet_error"}:
-        print(f"[WARN] Unknown event_type: {event_type}")
-
-    if target == "send_over_lora":
-        send_event_over_lora(event)
-
-    elif target == "log_only":
-        print(f"[LOG] {event_type}: {event}")
-
-    elif target == "noop":
-        pass
-
-    else:
-        print(f"[WARN] Unknown target '{target}' for event: {event_type}")
+    """Runs one event through its pipeline."""
+    dispatch_events([event])
+
+def checkpoint_detections():
+    """Saves the newest rowid whose detection is already in the outbox."""
+    rowid = detection_reader.last_rowid
+    if rowid is None:
+        return                      # start not resolved yet: keep the saved checkpoint
+    if aggregator is not None:
+        rowid = aggregator.safe_rowid(rowid)
+    detection_cursor.save(rowid)
+
+def dispatch_window(events: list):
+    """Called by the aggregator when a window closes."""
+    with detection_lock:
+        pipelines["avis_event"].run(events, after="aggregate")
+        checkpoint_detections()
+
+aggregator = DetectionAggregator(dispatch_window, lock=detection_lock) if AGGREGATION_ENABLED else None
+pipelines = build_pipelines(aggregator)
+
+def dispatch_detections(rows: list):
+    """Dispatches a batch of detection rows in insertion order."""
+    events = []
+    for row in rows:
+        event = BirdDetectionEvent.from_row(row).to_dict()
+        if aggregator is not None and event["event_type"] == "avis_event":
+            event["rowid"] = row["rowid"]     # consumed by the aggregate stage
+        events.append(event)
+    dispatch_events(events)
 
 def on_db_modified():
-    """Triggered when BirdNET database changes."""
-    row = get_latest_detection()
-    if not row:
-        return
-    event = BirdDetectionEvent.from_row(row).to_dict()
-    dispatch_event(event)
+    """Triggered when BirdNET database changes: sends every new detection."""
+    with detection_lock:
+        while True:
+            rows = detection_reader.read_new()
+            dispatch_detections(rows)
+            if rows:
+                checkpoint_detections()
+            if len(rows) < BATCH_LIMIT:
+                break
 
 def sample_weather():
     try:
@@ -77,9 +132,9 @@ def sample_weather():
     except Exception as e:
         print(f"[ERROR] Weather sample failed: {e}")
 
-def sample_telemetry():
+def sample_telemetry(wait: float = 0):
     try:
-        event = TelemetryEvent.from_gps().to_dict()
+        event = TelemetryEvent.from_gps(wait=wait).to_dict()
         dispatch_event(event)
     except Exception as e:
         print(f"[ERROR] Telemetry sample failed: {e}")
@@ -89,31 +144,27 @@ def main_loop():
     signal.signal(signal.SIGINT, handle_shutdown)
     signal.signal(signal.SIGTERM, handle_shutdown)
 
+    global detection_reader
+    detection_reader = DetectionReader(start=detection_cursor.catch_up_start)
+    get_position_estimator()    # start the GPS reader and averaging before the first telemetry sample
     observer = start_db_watch(on_db_modified)
+    on_db_modified()    # catch up on detections made while we were down
 
     try:
-        weather_interval = 5 * 60
-        telemetry_interval = 5 * 60
-
-        next_weather = time.time()
-        next_telemetry = time.time()
-
-        while running:
-            now = time.time()
-
-            if now >= next_weather:
-                sample_weather()
-                next_weather = now + weather_interval
-
-            if now >= next_telemetry:
-                sample_telemetry()
-                next_telemetry = now + telemetry_interval
-
-            time.sleep(1)
+        scheduler.every("weather", WEATHER_INTERVAL_SEC, sample_weather, timeout=SAMPLE_TIMEOUT_SEC)
+        scheduler.every("telemetry", TELEMETRY_INTERVAL_SEC, sample_telemetry, timeout=SAMPLE_TIMEOUT_SEC)
+        scheduler.run()
 
     finally:
         observer.stop()
         observer.join()
+        if aggregator is not None:
+            aggregator.flush()
+        detection_reader.close()
+        get_gps_service().stop()
+        get_sensor_manager().close()
+        close_reporting()
+        get_radio_service().stop()
         print("Dispatcher stopped.")
 
 if __name__ == "__main__":
@@ -121,9 +172,12 @@ if __name__ == "__main__":
         arg = sys.argv[1]
         if arg == "--weather":
             sample_weather()
+            get_radio_service().stop()
             sys.exit(0)
         elif arg == "--telemetry":
-            sample_telemetry()
+            sample_telemetry(wait=60)
+            get_gps_service().stop()
+            get_radio_service().stop()
             sys.exit(0)
 
     main_loop()
\ No newline at end of file
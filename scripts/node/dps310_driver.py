@@ -8,7 +8,11 @@ Returns:
     pressure in hPa (hectopascals)
 
 Usage:
-    pressure = read_dps310()
+    pressure = read_dps310()               # one-shot: opens the bus and loads
+                                           # calibration coefficients each call
+
+    dps = open_dps310(i2c)                 # long-lived handle (sensor_manager.py)
+    pressure = measure_dps310(dps)
 """
 
 import board
@@ -16,8 +20,17 @@ import busio
 import adafruit_dps310
 
 
+def open_dps310(i2c, address: int = 0x77):
+    """Initializes the sensor (reads its calibration coefficients) on an open bus."""
+    return adafruit_dps310.DPS310(i2c, address=address)
+
+
+def measure_dps310(dps):
+    """Returns barometric pressure in hPa. Raises on I2C failure."""
+    return float(dps.pressure)
+
+
 def read_dps310(address: int = 0x77):
     """Returns barometric pressure in hPa. Raises on I2C failure."""
     i2c = busio.I2C(board.SCL, board.SDA)
-    dps = adafruit_dps310.DPS310(i2c, address=address)
-    return float(dps.pressure)
+    return measure_dps310(open_dps310(i2c, address))
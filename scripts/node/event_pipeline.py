@@ -0,0 +1,258 @@
+"""
+event_pipeline.py
+-----------------
+
+Per-event-type processing pipelines for the node dispatcher.
+
+Each event type is routed through an ordered list of stages. A stage takes
+a batch (list) of event dicts and returns the events that continue, so it
+can drop, rewrite or hold events back. Cheap rejects (validation,
+confidence, rate limits) come first, then the trial encode, and the route
+to the radio outbox last.
+
+Stages:
+- validate    drops events the Protocol schema cannot encode (unknown type,
+              missing fields) before any encoding work
+- confidence  drops avis_events below MIN_CONFIDENCE_BIN
+- report      deadband/max-silence reporting policy (reporting_policy.py)
+- aggregate   hands avis_events to the DetectionAggregator; its windows
+              re-enter the pipeline after this stage (Pipeline.run(after=))
+- rate_limit  optional token bucket (off unless AVIS_RATE_PER_HOUR is set);
+              excess events are dropped and counted. Airtime is normally
+              governed by the radio's uplink scheduler, which coalesces and
+              defers instead of dropping
+- encode      trial encode with the radio's encoder (bit-packed when
+              radio_service.PACKED_ENABLED, else Protocol.encode_into() a
+              reused scratch buffer), so events the radio writer could not
+              encode never reach the durable outbox
+- route       the event's 'target': send_over_lora (RadioService outbox),
+              log_only or noop
+
+Stages only act on events bound for the radio (target "send_over_lora")
+except route, so log_only/noop events pass straight through. Every stage's
+calls, events in/out and latency are recorded (Pipeline.stats()).
+
+New stages are classes with a `name` and process(events) → events, added to
+the lists in build_pipelines().
+
+Usage:
+    from event_pipeline import build_pipelines
+    pipelines = build_pipelines(aggregator)
+    pipelines.get(event["event_type"], pipelines[None]).run([event])
+"""
+
+import threading
+import time
+
+import radio_service
+from protocol import Protocol
+from reporting_policy import get_reporting_policy
+from send_over_lora import send_event_over_lora
+
+
+MIN_CONFIDENCE_BIN = 0     # confidence bins 0–7 (confidence_manager); 0 lets everything through
+AVIS_RATE_PER_HOUR = None  # e.g. 120 to drop detections beyond that rate (they are not resent)
+AVIS_BURST = 30
+SCRATCH_BYTES = 64         # larger than any single event's wire format
+
+
+def _for_radio(event: dict) -> bool:
+    return event.get("target") == "send_over_lora"
+
+
+# ─── Stages ───────────────────────────────────────────────────────
+
+class Stage:
+    name = "stage"
+
+    def process(self, events: list) -> list:
+        return events
+
+
+class Validate(Stage):
+    name = "validate"
+
+    def __init__(self, proto: Protocol):
+        self._proto = proto
+
+    def process(self, events: list) -> list:
+        kept = []
+        for event in events:
+            reason = self._proto.validate(event) if _for_radio(event) else None
+            if reason:
+                print(f"[WARN] Dropping {event.get('event_type')}: {reason}")
+            else:
+                kept.append(event)
+        return kept
+
+
+class ConfidenceFilter(Stage):
+    name = "confidence"
+
+    def __init__(self, min_bin: int = MIN_CONFIDENCE_BIN):
+        self.min_bin = min_bin
+
+    def process(self, events: list) -> list:
+        return [e for e in events
+                if e.get("event_type") != "avis_event" or e.get("confidence", 0) >= self.min_bin]
+
+
+class Report(Stage):
+    name = "report"
+
+    def process(self, events: list) -> list:
+        kept = []
+        for event in events:
+            policy = get_reporting_policy(event.get("event_type"))
+            if policy is None or policy.should_send(event):
+                kept.append(event)
+        return kept
+
+
+class Aggregate(Stage):
+    """Holds avis_events in the aggregator; it emits them later as windows."""
+    name = "aggregate"
+
+    def __init__(self, aggregator):
+        self.aggregator = aggregator
+
+    def process(self, events: list) -> list:
+        passed = []
+        for event in events:
+            if event.get("event_type") == "avis_event":
+                self.aggregator.add(event, event.pop("rowid", None))
+            else:
+                passed.append(event)
+        return passed
+
+
+class RateLimit(Stage):
+    name = "rate_limit"
+
+    def __init__(self, per_hour: float, burst: int):
+        self.rate = per_hour / 3600.0
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def process(self, events: list) -> list:
+        kept = []
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            for event in events:
+                if not _for_radio(event) or self._tokens >= 1:
+                    if _for_radio(event):
+                        self._tokens -= 1
+                    kept.append(event)
+                else:
+                    self.dropped += 1
+        if len(kept) < len(events):
+            print(f"[WARN] Rate limit: dropped {len(events) - len(kept)} events")
+        return kept
+
+
+class Encode(Stage):
+    name = "encode"
+
+    def __init__(self, proto: Protocol, packed: bool = False):
+        self._proto = proto
+        self.packed = packed
+        self._scratch = bytearray(SCRATCH_BYTES)
+        self._lock = threading.Lock()
+
+    def _encodes(self, event: dict) -> bool:
+        if self.packed:
+            return bool(self._proto.encode_packed(event))
+        return bool(self._proto.encode_into(self._scratch, 0, event))
+
+    def process(self, events: list) -> list:
+        with self._lock:
+            return [e for e in events if not _for_radio(e) or self._encodes(e)]
+
+
+class Route(Stage):
+    name = "route"
+
+    def process(self, events: list) -> list:
+        for event in events:
+            target = event.get("target", "noop")
+            event_type = event.get("event_type", "unknown")
+            if target == "send_over_lora":
+                send_event_over_lora(event)
+            elif target == "log_only":
+                print(f"[LOG] {event_type}: {event}")
+            elif target == "noop":
+                pass
+            else:
+                print(f"[WARN] Unknown target '{target}' for event: {event_type}")
+        return events
+
+
+# ─── Pipeline ─────────────────────────────────────────────────────
+
+class Pipeline:
+    def __init__(self, stages: list):
+        self.stages = stages
+        self._lock = threading.Lock()
+        self._stats = {s.name: [0, 0, 0, 0.0, 0.0] for s in stages}  # calls, in, out, total, max
+
+    def run(self, events: list, after: str = None) -> list:
+        """Runs events through the stages (or those after the named one)."""
+        start = 0
+        if after is not None:
+            start = next(i for i, s in enumerate(self.stages) if s.name == after) + 1
+        for stage in self.stages[start:]:
+            if not events:
+                break
+            t0 = time.perf_counter()
+            out = stage.process(events)
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                st = self._stats[stage.name]
+                st[0] += 1
+                st[1] += len(events)
+                st[2] += len(out)
+                st[3] += elapsed
+                st[4] = max(st[4], elapsed)
+            events = out
+        return events
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "calls": calls,
+                    "in": n_in,
+                    "out": n_out,
+                    "avg_ms": round(total / calls * 1000, 3) if calls else None,
+                    "max_ms": round(worst * 1000, 3),
+                }
+                for name, (calls, n_in, n_out, total, worst) in self._stats.items()
+            }
+
+
+def build_pipelines(aggregator=None) -> dict:
+    """
+    Pipelines per event_type; key None is the default for all other types.
+    Pass the dispatcher's DetectionAggregator to enable the aggregate stage.
+    """
+    proto = Protocol()
+    packed = radio_service.PACKED_ENABLED       # trial-encode the way the radio writer will
+    avis = [Validate(proto), ConfidenceFilter()]
+    if aggregator is not None:
+        avis.append(Aggregate(aggregator))
+    if AVIS_RATE_PER_HOUR is not None:
+        avis.append(RateLimit(AVIS_RATE_PER_HOUR, AVIS_BURST))
+    avis += [Encode(proto, packed), Route()]
+
+    return {
+        "avis_event": Pipeline(avis),
+        # the reporting policy remembers what it let through, so it goes after the trial encode
+        "weather_event": Pipeline([Validate(proto), Encode(proto, packed), Report(), Route()]),
+        "telemetry_event": Pipeline([Validate(proto), Encode(proto, packed), Report(), Route()]),
+        None: Pipeline([Validate(proto), Encode(proto, packed), Route()]),
+    }
@@ -2,79 +2,212 @@
 gps_calibrator.py
 ----------------------
 
-Collects GPS readings every 10 seconds for a fixed 15-minute window,
-then returns a single averaged lat/lon/alt result.
-
-Intended for stable, low-drift GPS reporting in telemetry events.
+Streaming position estimate for a stationary node, fed by the background
+GPS reader (gps_service.py).
+
+Instead of blocking for a 15-minute window and averaging a list of
+samples, every fix updates a running mean and variance (Welford) per axis
+in O(1) memory, so a position and its uncertainty are available at any
+time and keep improving for as long as the node runs.
+
+Behavior:
+- Takes at most one fix per SAMPLE_INTERVAL_SEC (consecutive 1 Hz fixes
+  are strongly correlated and would overstate the precision)
+- Skips fixes with HDOP above MAX_HDOP
+- Rejects outliers with a median/MAD gate over the last RING_SIZE fixes:
+  a fix further than GATE_K robust standard deviations (1.4826·MAD, floored
+  at MAD_FLOOR_H_M / MAD_FLOOR_V_M metres) from the ring's median is not
+  added to the estimate
+- If the ring's median drifts more than RELOCATE_M from the estimate, the
+  node has been moved: the estimate restarts from the ring's fixes within
+  RELOCATE_M / 2 of the new median, gated by a spread taken from those
+  fixes alone (the ring still holds pre-move fixes, whose spread would
+  let old-position fixes through)
+- The estimate counts as converged after MIN_SAMPLES fixes once the
+  horizontal standard error is below CONVERGED_H_M
 
 Usage:
-    from node_gps_calibrator import start_gps_sampling, is_sampling_complete, get_averaged_fix
-
-    start_gps_sampling()       # blocks for 15 minutes
-    if is_sampling_complete():
-        lat, lon, alt = get_averaged_fix()
+    from gps_calibrator import get_position_estimator
+    estimator = get_position_estimator()   # starts the GPS reader if needed
+    pos = estimator.estimate()             # Position or None, never blocks
+    if pos and pos.converged:
+        print(pos.lat, pos.lon, pos.alt, pos.horizontal_m, pos.vertical_m)
 """
 
+import math
+import threading
 import time
-from gps_driver import read_gps_fix  # should return (lat, lon, alt)
-
-_SAMPLE_DURATION_SEC = 15 * 60
-_SAMPLE_INTERVAL_SEC = 10
-
-_samples = []
-_start_time = None
-_done = False
-
-def start_gps_sampling():
-    """
-    Starts a fixed-duration GPS sampling routine (blocking for 15 minutes).
-    Collects a new sample every 10 seconds from read_gps_fix().
-    Only valid (float) results are stored.
-    """
-    global _samples, _start_time, _done
-    _samples = []
-    _start_time = time.time()
-    _done = False
-
-    print("Starting 15-minute GPS averaging window...")
-
-    while time.time() - _start_time < _SAMPLE_DURATION_SEC:
-        try:
-            lat, lon, alt = read_gps_fix()
-            if all(isinstance(x, float) for x in (lat, lon, alt)):
-                _samples.append((lat, lon, alt))
-                print(f"[GPS] Sample {len(_samples)}: {lat:.6f}, {lon:.6f}, {alt:.1f}m")
+from collections import deque
+from statistics import median
+
+from gps_service import get_gps_service
+
+
+SAMPLE_INTERVAL_SEC = 10
+MAX_HDOP = 5.0
+RING_SIZE = 15
+MIN_RING = 5               # no gating until the ring holds this many fixes
+GATE_K = 3.5
+MAD_FLOOR_H_M = 1.0
+MAD_FLOOR_V_M = 2.0
+RELOCATE_M = 50.0
+MIN_SAMPLES = 30
+CONVERGED_H_M = 2.0
+
+METERS_PER_DEG = 111_320.0
+MAD_SCALE = 1.4826         # MAD → standard deviation for normal data
+
+
+class _Welford:
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+
+class Position:
+    __slots__ = ("lat", "lon", "alt", "samples", "horizontal_m", "vertical_m", "converged")
+
+    def __init__(self, lat, lon, alt, samples, horizontal_m, vertical_m, converged):
+        self.lat = lat
+        self.lon = lon
+        self.alt = alt
+        self.samples = samples
+        self.horizontal_m = horizontal_m    # standard error of the mean, metres
+        self.vertical_m = vertical_m
+        self.converged = converged
+
+    def __repr__(self):
+        return (f"<Position {self.lat:.6f}, {self.lon:.6f}, {self.alt:.1f}m "
+                f"±{self.horizontal_m:.1f}m/±{self.vertical_m:.1f}m n={self.samples}"
+                f"{' converged' if self.converged else ''}>")
+
+
+class PositionEstimator:
+    def __init__(self, sample_interval: float = SAMPLE_INTERVAL_SEC):
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+        self._ring = deque(maxlen=RING_SIZE)     # recent (lat, lon, alt), accepted or not
+        self._last_sample = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._axes = (_Welford(), _Welford(), _Welford())
+            self._ring.clear()
+            self.accepted = 0
+            self.rejected = 0
+            self.relocations = 0
+
+    # ─── Input ─────────────────────────────────────────────────────
+    def on_fix(self, fix):
+        """GPSService listener: feeds one fix, subsampled to sample_interval."""
+        now = time.monotonic()
+        if self._last_sample is not None and now - self._last_sample < self.sample_interval:
+            return
+        if fix.hdop is not None and fix.hdop > MAX_HDOP:
+            return
+        self._last_sample = now
+        self.add(fix.lat, fix.lon, fix.alt)
+
+    def add(self, lat: float, lon: float, alt: float) -> bool:
+        """Adds one sample; returns False if the outlier gate rejected it."""
+        with self._lock:
+            sample = (lat, lon, alt)
+            gate = self._ring_gate() if len(self._ring) >= MIN_RING else None
+            self._ring.append(sample)
+            accepted = gate is None or self._passes(sample, *gate)
+            if accepted:
+                self.accepted += 1
+                for axis, x in zip(self._axes, sample):
+                    axis.add(x)
             else:
-                print("[WARN] Invalid GPS sample skipped.")
-        except Exception as e:
-            print(f"[WARN] GPS read failed: {e}")
-        time.sleep(_SAMPLE_INTERVAL_SEC)
-
-    _done = True
-    print("GPS averaging complete.")
-
-def is_sampling_complete():
-    """Returns True if the sampling window has completed."""
-    return _done
-
-def get_averaged_fix():
-    """
-    Returns (lat, lon, alt) as averaged floats.
-    If no valid samples were collected, returns (0.0, 0.0, 0.0).
-    Raises if sampling is not yet complete.
-    """
-    if not _done:
-        raise RuntimeError("GPS sampling is not yet complete.")
-
-    if not _samples:
-        print("[WARN] No valid GPS samples were collected.")
-        return 0.0, 0.0, 0.0
-
-    lat_avg = sum(s[0] for s in _samples) / len(_samples)
-    lon_avg = sum(s[1] for s in _samples) / len(_samples)
-    alt_avg = sum(s[2] for s in _samples) / len(_samples)
-    return lat_avg, lon_avg, alt_avg
-
-def get_sample_count():
-    """Returns the number of valid samples collected."""
-    return len(_samples)
+                self.rejected += 1
+            if len(self._ring) >= MIN_RING:
+                self._check_relocation()
+            return accepted
+
+    def _ring_gate(self, samples=None):
+        """(medians, robust sigmas in metres, metres per unit) of the ring or `samples`."""
+        samples = self._ring if samples is None else samples
+        medians = tuple(median(s[i] for s in samples) for i in range(3))
+        scales = (METERS_PER_DEG, METERS_PER_DEG * math.cos(math.radians(medians[0])), 1.0)
+        sigmas = tuple(
+            max(MAD_SCALE * median(abs(s[i] - medians[i]) for s in samples) * scales[i], floor)
+            for i, floor in enumerate((MAD_FLOOR_H_M, MAD_FLOOR_H_M, MAD_FLOOR_V_M))
+        )
+        return medians, sigmas, scales
+
+    @staticmethod
+    def _passes(sample, medians, sigmas, scales) -> bool:
+        return all(abs(sample[i] - medians[i]) * scales[i] <= GATE_K * sigmas[i] for i in range(3))
+
+    def _check_relocation(self):
+        """Restarts the estimate if the ring's median left it (lock held)."""
+        medians, _, scales = self._ring_gate()
+        lat, lon, _ = self._axes
+        if lat.n and math.hypot((medians[0] - lat.mean) * scales[0],
+                                (medians[1] - lon.mean) * scales[1]) <= RELOCATE_M:
+            return
+        print(f"[gps_calibrator] Position moved by more than {RELOCATE_M:.0f}m: "
+              f"restarting estimate")
+        self._axes = (_Welford(), _Welford(), _Welford())
+        near = [s for s in self._ring
+                if math.hypot((s[0] - medians[0]) * scales[0],
+                              (s[1] - medians[1]) * scales[1]) <= RELOCATE_M / 2]
+        gate = self._ring_gate(near) if near else None
+        for sample in near:
+            if self._passes(sample, *gate):
+                for axis, x in zip(self._axes, sample):
+                    axis.add(x)
+        self.relocations += 1
+
+    # ─── Output ────────────────────────────────────────────────────
+    def estimate(self):
+        """Current Position, or None before the first accepted fix."""
+        with self._lock:
+            lat, lon, alt = self._axes
+            if not lat.n:
+                return None
+            n = lat.n
+            lat_m = math.sqrt(lat.variance / n) * METERS_PER_DEG
+            lon_m = math.sqrt(lon.variance / n) * METERS_PER_DEG * math.cos(math.radians(lat.mean))
+            horizontal_m = math.hypot(lat_m, lon_m)
+            vertical_m = math.sqrt(alt.variance / n)
+            converged = n >= MIN_SAMPLES and horizontal_m <= CONVERGED_H_M
+            return Position(lat.mean, lon.mean, alt.mean, n, horizontal_m, vertical_m, converged)
+
+    def stats(self) -> dict:
+        pos = self.estimate()
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "relocations": self.relocations,
+            "estimate": repr(pos) if pos else None,
+        }
+
+
+_estimator = None
+_estimator_lock = threading.Lock()
+
+
+def get_position_estimator() -> PositionEstimator:
+    """Returns the process-wide PositionEstimator, attached to the GPS reader."""
+    global _estimator
+    with _estimator_lock:
+        if _estimator is None:
+            _estimator = PositionEstimator()
+            get_gps_service().add_listener(_estimator.on_fix)
+        return _estimator
@@ -8,7 +8,8 @@ Returns:
 
 If the fix is not valid, raises RuntimeError.
 
-This driver is called by node_gps_calibrator for repeated sampling.
+Long-running processes use gps_service.py instead, which keeps the port
+open and caches the latest fix (and feeds gps_calibrator's estimate).
 """
 
 import time
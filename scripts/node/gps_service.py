@@ -0,0 +1,164 @@
+"""
+gps_service.py
+--------------
+
+Background reader for the Adafruit Ultimate GPS v3 that keeps the latest
+fix in memory, so telemetry sampling never blocks on the UART.
+
+Responsibilities:
+- Open the GPS UART once and send the PMTK configuration once
+  (RMC + GGA sentences, 1 Hz updates)
+- Parse NMEA continuously on its own thread (adafruit_gps)
+- Keep the latest valid fix with its time, HDOP and satellite count
+- Notify listeners of every new fix (e.g. the position estimator)
+- Re-open the port after a serial failure
+
+Usage:
+    from gps_service import get_gps_service
+    gps = get_gps_service()                  # started on first use
+    fix = gps.latest(max_age=FIX_MAX_AGE_SEC)  # GPSFix or None, never blocks
+    fix = gps.latest(wait=60)                  # one-shot tools: wait for a fix
+    if fix:
+        print(fix.lat, fix.lon, fix.alt, fix.hdop, fix.satellites, fix.age)
+"""
+
+import threading
+import time
+
+import serial
+import adafruit_gps
+
+from gps_driver import GPS_PORT, GPS_BAUD
+
+
+FIX_MAX_AGE_SEC = 30        # older fixes are treated as "no fix"
+REOPEN_DELAY_SEC = 5
+IDLE_SLEEP_SEC = 0.1        # between polls when no sentence is waiting
+
+
+class GPSFix:
+    __slots__ = ("lat", "lon", "alt", "hdop", "satellites", "timestamp", "_monotonic")
+
+    def __init__(self, lat: float, lon: float, alt: float, hdop, satellites):
+        self.lat = lat
+        self.lon = lon
+        self.alt = alt
+        self.hdop = hdop
+        self.satellites = satellites
+        self.timestamp = int(time.time())
+        self._monotonic = time.monotonic()
+
+    @property
+    def age(self) -> float:
+        """Seconds since this fix was parsed."""
+        return time.monotonic() - self._monotonic
+
+    def __repr__(self):
+        return (f"<GPSFix {self.lat:.6f}, {self.lon:.6f}, {self.alt:.1f}m "
+                f"hdop={self.hdop} sats={self.satellites} age={self.age:.1f}s>")
+
+
+class GPSService:
+    def __init__(self, port: str = GPS_PORT, baudrate: int = GPS_BAUD):
+        self.port = port
+        self.baudrate = baudrate
+        self._uart = None
+        self._gps = None
+        self._fix = None
+        self._fix_cond = threading.Condition()
+        self._listeners = []
+        self._running = False
+        self._thread = None
+        self.fixes = 0
+
+    # ─── Consumer API ──────────────────────────────────────────────
+    def latest(self, max_age: float = FIX_MAX_AGE_SEC, wait: float = 0):
+        """
+        The newest fix if it is at most max_age seconds old, else None.
+        With wait > 0, waits up to that many seconds for a fresh fix.
+        """
+        fresh = lambda: self._fix is not None and self._fix.age <= max_age
+        with self._fix_cond:
+            if wait > 0:
+                self._fix_cond.wait_for(fresh, timeout=wait)
+            return self._fix if fresh() else None
+
+    def add_listener(self, callback):
+        """Registers callback(fix: GPSFix), called from the reader thread."""
+        self._listeners.append(callback)
+
+    # ─── Lifecycle ─────────────────────────────────────────────────
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._reader_loop, name="gps-reader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+        self._close()
+
+    # ─── Reader Thread ─────────────────────────────────────────────
+    def _open(self):
+        self._uart = serial.Serial(self.port, baudrate=self.baudrate, timeout=1)
+        self._gps = adafruit_gps.GPS(self._uart, debug=False)
+        # Minimal sentence set + 1Hz update
+        self._gps.send_command(b"PMTK314,0,1,0,1,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0")
+        self._gps.send_command(b"PMTK220,1000")
+
+    def _close(self):
+        if self._uart is not None:
+            try:
+                self._uart.close()
+            except Exception:
+                pass
+        self._uart = self._gps = None
+
+    def _reader_loop(self):
+        while self._running:
+            try:
+                if self._gps is None:
+                    self._open()
+                if not self._gps.update():
+                    time.sleep(IDLE_SLEEP_SEC)
+                    continue
+                if self._gps.has_fix and self._gps.latitude is not None:
+                    self._publish(GPSFix(
+                        float(self._gps.latitude),
+                        float(self._gps.longitude),
+                        float(self._gps.altitude_m or 0.0),
+                        self._gps.hdop,
+                        self._gps.satellites,
+                    ))
+            except Exception as e:
+                print(f"[gps_service] GPS read failed: {e}")
+                self._close()
+                time.sleep(REOPEN_DELAY_SEC)
+
+    def _publish(self, fix: GPSFix):
+        with self._fix_cond:
+            self._fix = fix
+            self.fixes += 1
+            self._fix_cond.notify_all()
+        for callback in list(self._listeners):
+            try:
+                callback(fix)
+            except Exception as e:
+                print(f"[gps_service] Fix listener failed: {e}")
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_gps_service() -> GPSService:
+    """Returns the process-wide GPSService, starting it on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = GPSService()
+            _service.start()
+        return _service
@@ -0,0 +1,73 @@
+"""
+lora_params.py
+--------------
+
+LoRaWAN regional parameters used by the node's uplink path.
+
+The node is configured by initial_at_setup.py for US915 (AT+BAND=5) with
+ADR off and a fixed data rate (AT+DR=3). CURRENT_DR must match that.
+
+US915 uplink data rates (LoRaWAN Regional Parameters RP002):
+- DR   SF   BW (kHz)   max FRMPayload (bytes, no FOpts)
+- 0    10   125        11
+- 1     9   125        53
+- 2     8   125        125
+- 3     7   125        242
+- 4     8   500        242
+
+Time on air (Semtech LoRa modem formula, AN1200.13):
+- Explicit header, CRC on (uplink), coding rate 4/5, 8 preamble symbols,
+  low data rate optimization when a symbol lasts longer than 16 ms
+- Computed over the whole PHYPayload: FRMPayload + 13 bytes of LoRaWAN
+  overhead (MHDR, FHDR without FOpts, FPort, MIC)
+- US915 uplinks are limited to a 400 ms dwell time (FCC), so
+  max_payload_for_airtime() bounds frames by airtime as well as by size
+
+Usage:
+    from lora_params import max_payload, airtime
+    limit = max_payload()          # for CURRENT_DR
+    seconds = airtime(24)          # 24-byte FRMPayload at CURRENT_DR
+"""
+
+import math
+
+
+CURRENT_DR = 3
+CODING_RATE = 1            # 4/(4+CR) → 4/5
+PREAMBLE_SYMBOLS = 8
+LORAWAN_OVERHEAD = 13      # MHDR 1 + FHDR 7 + FPort 1 + MIC 4
+MAX_DWELL_SEC = 0.4
+
+US915_DATA_RATES = {
+    0: {"sf": 10, "bw_khz": 125, "max_payload": 11},
+    1: {"sf": 9, "bw_khz": 125, "max_payload": 53},
+    2: {"sf": 8, "bw_khz": 125, "max_payload": 125},
+    3: {"sf": 7, "bw_khz": 125, "max_payload": 242},
+    4: {"sf": 8, "bw_khz": 500, "max_payload": 242},
+}
+
+
+def max_payload(dr: int = CURRENT_DR) -> int:
+    """Maximum FRMPayload length in bytes at the given data rate."""
+    return US915_DATA_RATES[dr]["max_payload"]
+
+
+def airtime(payload_len: int, dr: int = CURRENT_DR) -> float:
+    """Time on air in seconds of an uplink carrying payload_len bytes of FRMPayload."""
+    params = US915_DATA_RATES[dr]
+    sf = params["sf"]
+    t_sym = (2 ** sf) / (params["bw_khz"] * 1000)
+    de = 1 if t_sym > 0.016 else 0
+    pl = payload_len + LORAWAN_OVERHEAD
+    n_payload = 8 + max(
+        math.ceil((8 * pl - 4 * sf + 28 + 16) / (4 * (sf - 2 * de))) * (CODING_RATE + 4), 0
+    )
+    return (PREAMBLE_SYMBOLS + 4.25 + n_payload) * t_sym
+
+
+def max_payload_for_airtime(limit_sec: float = MAX_DWELL_SEC, dr: int = CURRENT_DR) -> int:
+    """Largest FRMPayload (bytes, <= max_payload(dr)) whose airtime fits limit_sec."""
+    n = max_payload(dr)
+    while n > 0 and airtime(n, dr) > limit_sec:
+        n -= 1
+    return n
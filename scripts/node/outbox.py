@@ -0,0 +1,160 @@
+"""
+outbox.py
+---------
+
+Durable store-and-forward outbox for node uplinks (SQLite, WAL mode).
+
+Every event is written here before the radio touches it and deleted only
+once the module reports the uplink complete, so a busy, unjoined or failing
+RUI3 module (or a restart) delays events instead of losing them.
+
+Responsibilities:
+- put(): persist an event with its priority and FPort (synchronous=FULL,
+  so an acknowledged put survives power loss on the SD card)
+- peek(): pending events in send order (priority, then oldest first)
+- ack(): remove events whose uplink completed; fail(): count a failed try
+- Keep the stored event JSON under MAX_OUTBOX_BYTES by evicting the oldest
+  events first (down to EVICT_TO of the limit); freed pages are reused, so
+  the file stays bounded too
+- record_airtime() / airtime_log(): the uplink scheduler's charged airtime
+  (wall-clock time, seconds on air), kept for AIRTIME_KEEP_SEC so the
+  rolling budgets survive a restart
+
+Usage:
+    from outbox import Outbox
+    box = Outbox()
+    row_id = box.put(event, priority=0, fport=1)
+    for row_id, fport, event in box.peek(50): ...
+    box.ack([row_id])
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+OUTBOX_PATH = Path(__file__).resolve().parent.parent.parent / "data" / "outbox.db"
+MAX_OUTBOX_BYTES = 2 * 1024 * 1024     # stored event JSON, ~10k events
+EVICT_TO = 0.9                         # evict down to this fraction, so eviction is amortized
+AIRTIME_KEEP_SEC = 86400.0             # the scheduler's longest window
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS outbox (
+        id        INTEGER PRIMARY KEY AUTOINCREMENT,
+        priority  INTEGER NOT NULL,
+        fport     INTEGER NOT NULL,
+        created   REAL    NOT NULL,
+        attempts  INTEGER NOT NULL DEFAULT 0,
+        size      INTEGER NOT NULL,
+        event     TEXT    NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_outbox_order ON outbox (priority, id);
+    CREATE TABLE IF NOT EXISTS airtime (
+        at        REAL    NOT NULL,
+        airtime   REAL    NOT NULL
+    );
+"""
+
+
+class Outbox:
+    def __init__(self, path: Path = OUTBOX_PATH, max_bytes: int = MAX_OUTBOX_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(SCHEMA)
+        self._count, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM outbox"
+        ).fetchone()
+        self.evicted = 0
+
+    def put(self, event: dict, priority: int, fport: int) -> int:
+        """Persists an event; returns its row id."""
+        data = json.dumps(event, separators=(",", ":"))
+        with self._lock:
+            row_id = self._conn.execute(
+                "INSERT INTO outbox (priority, fport, created, size, event) VALUES (?, ?, ?, ?, ?)",
+                (priority, fport, time.time(), len(data), data)
+            ).lastrowid
+            self._count += 1
+            self._bytes += len(data)
+            if self._bytes > self.max_bytes:
+                self._evict()
+        return row_id
+
+    def _evict(self):
+        """Deletes the oldest events until the outbox is below EVICT_TO (lock held)."""
+        target = self.max_bytes * EVICT_TO
+        freed = evicted = 0
+        rows = self._conn.execute("SELECT id, size FROM outbox ORDER BY id").fetchall()
+        last_id = None
+        for row_id, size in rows:
+            if self._bytes - freed <= target:
+                break
+            freed += size
+            evicted += 1
+            last_id = row_id
+        if last_id is None:
+            return
+        self._conn.execute("DELETE FROM outbox WHERE id <= ?", (last_id,))
+        self._count -= evicted
+        self._bytes -= freed
+        self.evicted += evicted
+        print(f"[outbox] Full: evicted {evicted} oldest events ({freed} B)")
+
+    def peek(self, limit: int) -> list:
+        """Up to `limit` pending events as (id, fport, event), in send order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, fport, event FROM outbox ORDER BY priority, id LIMIT ?", (limit,)
+            ).fetchall()
+        return [(row_id, fport, json.loads(event)) for row_id, fport, event in rows]
+
+    def ack(self, ids: list):
+        """Removes events that were transmitted (or are undeliverable)."""
+        if not ids:
+            return
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            freed, removed = self._conn.execute(
+                f"SELECT COALESCE(SUM(size), 0), COUNT(*) FROM outbox WHERE id IN ({marks})", ids
+            ).fetchone()
+            self._conn.execute(f"DELETE FROM outbox WHERE id IN ({marks})", ids)
+            self._count -= removed
+            self._bytes -= freed
+
+    def fail(self, ids: list):
+        """Records a failed transmission attempt; the events stay queued."""
+        if not ids:
+            return
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            self._conn.execute(f"UPDATE outbox SET attempts = attempts + 1 WHERE id IN ({marks})", ids)
+
+    def record_airtime(self, at: float, t_air: float):
+        """Persists one uplink's airtime (at = time.time()) and prunes expired ones."""
+        with self._lock:
+            self._conn.execute("INSERT INTO airtime (at, airtime) VALUES (?, ?)", (at, t_air))
+            self._conn.execute("DELETE FROM airtime WHERE at < ?", (at - AIRTIME_KEEP_SEC,))
+
+    def airtime_log(self, since: float) -> list:
+        """Stored (at, airtime) charges newer than `since`, oldest first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT at, airtime FROM airtime WHERE at >= ? ORDER BY at", (since,)
+            ).fetchall()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def stats(self) -> dict:
+        return {"pending": self._count, "bytes": self._bytes, "evicted": self.evicted}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -5,15 +5,84 @@ protocol.py
 Handles binary encoding and decoding of EnviroPulse events using
 structure_protocol.json, event_type_map.json, and taxonomy_map.json.
 
+Multi-event frames (event_frame):
+- encode_frame() packs several already-encoded events into one FRMPayload:
+  [event_frame id, count] followed by the events back to back
+- The server Protocol splits them using each event's schema length
+
+Compact frames (compact_frame, optional):
+- encode_compact() writes timestamps as varint offsets from a frame base
+  time and weather/telemetry fields as zigzag-varint deltas against the
+  previous sample of the same type
+- Every `keyframe_interval` samples per type (and after reset_compact())
+  a keyframe carries absolute values, so the server can resynchronize
+  after a lost uplink; each delta-coded sample carries a 1-byte sequence
+  number so the server can tell when its reference was lost
+
+Bit-packed events (optional):
+- Each event type may define a "packed" layout of bit-width fields in
+  structure_protocol.json (e.g. avis_event: 2-bit type + 3-bit confidence
+  + 11-bit taxonomy + 32-bit timestamp = 6 bytes instead of 8)
+- The leading 2 bits are the event type id (1–3), so a packed event always
+  starts with a byte >= 0x40, while byte-aligned events and frame markers
+  start below 0x40; decoders tell them apart from the first byte alone
+- Types without a packed layout are sent byte-aligned by encode_packed()
+- Layouts are compiled once into (shift, width, signed) tuples; encoding
+  and decoding are a handful of integer shifts and masks
+
+Regional species dictionary (optional, species_dictionary.json):
+- Built on the server from historical detections (species_dictionary.py);
+  the most frequent species get 1-byte codes
+- apply_dictionary() turns an avis_event for such a species into an
+  avis_dict_event (7 bytes instead of 8); other species stay avis_event
+  with the full uint16 taxonomy code, which is the escape path
+- Dictionary-coded uplinks use FPort DICT_FPORT_BASE + version, and
+  dictionary_announce() builds the (version, fingerprint) event the server
+  uses to confirm both sides hold the same dictionary
+- A dictionary whose fingerprint does not match its contents is ignored
+
+Compiled layouts:
+- Every schema "format" is compiled once into a struct.Struct; encode_into()
+  lets callers write events straight into a preallocated bytearray with
+  pack_into (the radio's frame buffer, the dispatcher's trial encode)
+  instead of building and joining bytes objects
+
 Guarantees crash-proof operation:
 - Invalid events will raise informative errors or return fallback
 - Unknown taxonomy or type values are replaced with "Unknown"/0
 """
 
+import copy
+import hashlib
 import struct
 import json
 from pathlib import Path
 
+
+KEYFRAME_FLAG = 0x80
+PACKED_TYPE_BITS = 2
+PACKED_MIN_BYTE = 0x40
+DICT_FPORT_BASE = 64
+DICT_MAX_VERSION = 63
+DICT_ESCAPE_CODE = 0xFF
+
+
+def dictionary_fingerprint(version: int, species: list) -> int:
+    """32-bit fingerprint of a species dictionary (same function on the server)."""
+    canonical = json.dumps([version, species], separators=(",", ":"))
+    return int.from_bytes(hashlib.sha256(canonical.encode("utf-8")).digest()[:4], "big")
+
+
+def _zigzag(n: int) -> int:
+    return (n << 1) ^ (n >> 63)
+
+
+def _write_varint(out: bytearray, n: int):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
 class Protocol:
     def __init__(self):
         base = Path(__file__).parent
@@ -22,6 +91,12 @@ class Protocol:
         self._taxonomy_map = self._load_json(base / "taxonomy_map.json")
         self._reverse_event_map = {v: k for k, v in self._event_map.items()}
         self._reverse_taxonomy_map = {v: k for k, v in self._taxonomy_map.items()}
+        self._compact_state = {}   # event_type → {"seq", "values", "since_key"}
+        self._structs = {
+            name: struct.Struct(d["format"]) for name, d in self._structure.items() if "format" in d
+        }
+        self._packed = self._compile_packed()
+        self._dictionary = self._load_dictionary(base / "species_dictionary.json")
 
     def _load_json(self, path: Path) -> dict:
         try:
@@ -31,40 +106,264 @@ class Protocol:
             print(f"[ERROR] Failed to load {path.name}: {e}")
             return {}
 
-    def encode(self, event: dict) -> bytes:
+    def _compile_packed(self) -> dict:
+        """
+        Returns {type_id: (event_type_str, length_bytes, [(name, shift, width, signed), ...])}
+        for every event type with a "packed" layout.
+        """
+        layouts = {}
+        for event_type_str, struct_def in self._structure.items():
+            packed = struct_def.get("packed")
+            if not packed:
+                continue
+            length = packed["length_bytes"]
+            shift = length * 8
+            fields = []
+            for field in packed["fields"]:
+                shift -= field["bits"]
+                fields.append((field["name"], shift, field["bits"], field.get("signed", False)))
+            if shift < 0 or fields[0][0] != "event_type" or fields[0][2] != PACKED_TYPE_BITS:
+                print(f"[ERROR] Invalid packed layout for {event_type_str}")
+                continue
+            layouts[self._event_map.get(event_type_str, 0)] = (event_type_str, length, fields)
+        return layouts
+
+    def _load_dictionary(self, path: Path):
+        """Returns {"version", "fingerprint", "codes": {name: code}} or None."""
+        if not path.exists():
+            return None
+        d = self._load_json(path)
         try:
-            event_type_str = event.get("event_type", "Unknown")
-            struct_def = self._structure.get(event_type_str)
-            if not struct_def:
-                raise ValueError(f"Unknown or unsupported event_type: '{event_type_str}'")
+            version, species = d["version"], d["species"]
+            if not 1 <= version <= DICT_MAX_VERSION or len(species) > DICT_ESCAPE_CODE:
+                raise ValueError("version or size out of range")
+            if dictionary_fingerprint(version, species) != d["fingerprint"]:
+                raise ValueError("fingerprint does not match contents")
+        except Exception as e:
+            print(f"[ERROR] Ignoring {path.name}: {e}")
+            return None
+        return {
+            "version": version,
+            "fingerprint": d["fingerprint"],
+            "codes": {name: code for code, name in enumerate(species)},
+        }
 
-            fmt = struct_def["format"]
-            fields = struct_def["fields"]
+    @property
+    def dictionary_version(self):
+        return self._dictionary["version"] if self._dictionary else None
 
-            values = []
-            for field in fields:
-                name = field["name"]
-                if name == "event_type":
-                    values.append(self._event_map.get(event_type_str, 0))
-                elif "map" in field and name == "taxonomy":
-                    values.append(self._taxonomy_map.get(event.get("common_name", "Unknown"), 0))
-                else:
-                    if name not in event:
-                        raise KeyError(f"Missing field '{name}' in event")
-                    values.append(event[name])
+    def dictionary_fport(self):
+        """FPort for dictionary-coded uplinks (None without a dictionary)."""
+        return DICT_FPORT_BASE + self._dictionary["version"] if self._dictionary else None
 
-            return struct.pack(fmt, *values)
+    def dictionary_announce(self, timestamp: int):
+        """The dictionary_announce event for the loaded dictionary (None without one)."""
+        if not self._dictionary:
+            return None
+        return {
+            "event_type": "dictionary_announce",
+            "timestamp": timestamp,
+            "version": self._dictionary["version"],
+            "fingerprint": self._dictionary["fingerprint"],
+        }
+
+    def apply_dictionary(self, event: dict) -> dict:
+        """Returns an avis_dict_event for dictionary species, else the event unchanged."""
+        if not self._dictionary or event.get("event_type") != "avis_event":
+            return event
+        code = self._dictionary["codes"].get(event.get("common_name"))
+        if code is None:
+            return event
+        return {**event, "event_type": "avis_dict_event", "species_code": code}
+
+    def validate(self, event: dict):
+        """Cheap schema check without encoding: None if encodable, else the reason."""
+        struct_def = self._structure.get(event.get("event_type"))
+        if not struct_def or "fields" not in struct_def:
+            return f"unknown event_type '{event.get('event_type')}'"
+        for field in struct_def["fields"]:
+            name = field["name"]
+            if name == "event_type" or ("map" in field and name == "taxonomy"):
+                continue
+            if name not in event:
+                return f"missing field '{name}'"
+        return None
+
+    def _field_values(self, event: dict):
+        """Returns (event_type_str, struct_def, values in schema order)."""
+        event_type_str = event.get("event_type", "Unknown")
+        struct_def = self._structure.get(event_type_str)
+        if not struct_def:
+            raise ValueError(f"Unknown or unsupported event_type: '{event_type_str}'")
+
+        values = []
+        for field in struct_def["fields"]:
+            name = field["name"]
+            if name == "event_type":
+                values.append(self._event_map.get(event_type_str, 0))
+            elif "map" in field and name == "taxonomy":
+                values.append(self._taxonomy_map.get(event.get("common_name", "Unknown"), 0))
+            else:
+                if name not in event:
+                    raise KeyError(f"Missing field '{name}' in event")
+                values.append(event[name])
+        return event_type_str, struct_def, values
+
+    def encode(self, event: dict) -> bytes:
+        try:
+            event_type_str, _, values = self._field_values(event)
+            return self._structs[event_type_str].pack(*values)
+
+        except Exception as e:
+            print(f"[ERROR] Failed to encode event: {e}")
+            return b''
+
+    def encode_into(self, buf, offset: int, event: dict) -> int:
+        """
+        Writes the event's encoding into buf at offset (pack_into, no new
+        bytes object); returns the number of bytes written, 0 on failure.
+        """
+        try:
+            event_type_str, _, values = self._field_values(event)
+            packer = self._structs[event_type_str]
+            packer.pack_into(buf, offset, *values)
+            return packer.size
 
         except Exception as e:
             print(f"[ERROR] Failed to encode event: {e}")
+            return 0
+
+    def encode_packed(self, event: dict) -> bytes:
+        """
+        Encodes an event with its bit-packed layout (b'' on failure). Types
+        without one (the 2-bit type field only holds ids 1–3, so e.g.
+        avis_summary_event) fall back to the byte-aligned encoding, which
+        decoders tell apart by its first byte.
+        """
+        try:
+            event_type_str, struct_def, values = self._field_values(event)
+            layout = self._packed.get(values[0])
+            if layout is None:
+                return self._structs[event_type_str].pack(*values)
+            by_name = {f["name"]: v for f, v in zip(struct_def["fields"], values)}
+
+            _, length, fields = layout
+            acc = 0
+            for name, shift, width, signed in fields:
+                v = by_name[name]
+                lo, hi = (-(1 << (width - 1)), 1 << (width - 1)) if signed else (0, 1 << width)
+                if not lo <= v < hi:
+                    raise ValueError(f"'{name}'={v} does not fit in {width} bits")
+                acc |= (v & ((1 << width) - 1)) << shift
+            return acc.to_bytes(length, "big")
+
+        except Exception as e:
+            print(f"[ERROR] Failed to encode packed event: {e}")
             return b''
 
+    def _decode_packed(self, data: bytes) -> dict:
+        event_type_str, length, fields = self._packed[data[0] >> (8 - PACKED_TYPE_BITS)]
+        if len(data) != length:
+            raise ValueError(f"Incorrect packed length for {event_type_str}: expected {length}, got {len(data)}")
+        acc = int.from_bytes(data, "big")
+        event = {"event_type": event_type_str}
+        for name, shift, width, signed in fields[1:]:
+            v = (acc >> shift) & ((1 << width) - 1)
+            if signed and v >> (width - 1):
+                v -= 1 << width
+            if name == "taxonomy":
+                event["common_name"] = self._reverse_taxonomy_map.get(v, "Unknown")
+            else:
+                event[name] = v
+        return event
+
+    def frame_overhead(self) -> int:
+        """Bytes added by an event_frame header."""
+        return self._structs["event_frame"].size
+
+    def frame_header_into(self, buf, count: int):
+        """Writes an event_frame header for `count` events at buf[0:]."""
+        self._structs["event_frame"].pack_into(buf, 0, self._event_map["event_frame"], count)
+
+    def encode_frame(self, payloads: list) -> bytes:
+        """
+        Packs encoded events (each from encode()) into one FRMPayload.
+        A single event is returned unchanged, without a frame header.
+        """
+        if len(payloads) == 1:
+            return payloads[0]
+        header = struct.pack(
+            self._structure["event_frame"]["format"],
+            self._event_map["event_frame"],
+            len(payloads)
+        )
+        return header + b"".join(payloads)
+
+    def encode_compact(self, events: list, commit: bool = True) -> bytes:
+        """
+        Encodes events as one compact_frame. With commit=False the delta state
+        is left untouched, so callers can size a candidate frame first.
+        Returns b'' if any event cannot be encoded.
+        """
+        try:
+            frame_def = self._structure["compact_frame"]
+            delta_types = set(frame_def.get("delta_types", []))
+            interval = frame_def.get("keyframe_interval", 8)
+            state = copy.deepcopy(self._compact_state)
+
+            rows = [self._field_values(e) for e in events]
+            base_time = min(values[1] for _, _, values in rows)
+
+            out = bytearray(struct.pack(
+                frame_def["format"], self._event_map["compact_frame"], base_time, len(rows)
+            ))
+            for event_type_str, _, values in rows:
+                type_id, timestamp, fields = values[0], values[1], values[2:]
+
+                if event_type_str not in delta_types:
+                    out.append(type_id)
+                    _write_varint(out, timestamp - base_time)
+                    for v in fields:
+                        _write_varint(out, _zigzag(v))
+                    continue
+
+                prev = state.get(event_type_str)
+                keyframe = prev is None or prev["since_key"] >= interval - 1
+                seq = 0 if prev is None else (prev["seq"] + 1) & 0xFF
+
+                out.append(type_id | (KEYFRAME_FLAG if keyframe else 0))
+                _write_varint(out, timestamp - base_time)
+                out.append(seq)
+                for i, v in enumerate(fields):
+                    _write_varint(out, _zigzag(v if keyframe else v - prev["values"][i]))
+
+                state[event_type_str] = {
+                    "seq": seq,
+                    "values": fields,
+                    "since_key": 0 if keyframe else prev["since_key"] + 1,
+                }
+
+            if commit:
+                self._compact_state = state
+            return bytes(out)
+
+        except Exception as e:
+            print(f"[ERROR] Failed to encode compact frame: {e}")
+            return b''
+
+    def reset_compact(self):
+        """Forces the next compact sample of every type to be a keyframe."""
+        self._compact_state = {}
+
     def decode(self, data: bytes) -> dict:
         if len(data) < 1:
             print("[ERROR] Cannot decode empty payload.")
             return {"event_type": "decode_error", "raw": data.hex()}
 
         try:
+            if data[0] >= PACKED_MIN_BYTE:
+                return self._decode_packed(data)
+
             event_type_id = data[0]
             event_type_str = self._reverse_event_map.get(event_type_id, "Unknown")
             struct_def = self._structure.get(event_type_str)
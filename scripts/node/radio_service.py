@@ -0,0 +1,376 @@
+"""
+radio_service.py
+----------------
+
+Long-lived, thread-safe owner of the RUI3 LoRa module's serial port.
+
+Responsibilities:
+- Open the UART once (RUI3Driver) and keep it open for the process lifetime
+- Accept events from any thread via submit(), persisting each one in the
+  durable outbox (outbox.py) before any transmission is attempted
+- Drain the outbox from a single writer thread in priority order
+  (detections before weather before telemetry, oldest first within a
+  priority): encode with Protocol, send AT+SEND and wait for the module's
+  TX completion event before the next uplink, so concurrent producers
+  (watchdog callback thread, main sampling loop) can never collide on the
+  UART or overlap a TX in flight
+- Remove events from the outbox only once their uplink completed; after a
+  failure they stay queued and are retried with exponential backoff, so
+  outages and restarts delay events instead of losing them
+- Ask the airtime scheduler (uplink_scheduler.py) before every uplink:
+  send now, hold the frame to coalesce more events when the hourly/daily
+  airtime budget runs low, or defer until budget frees up; this also paces
+  the backlog drain after an outage. Frames are bounded by the DR's
+  maximum payload and the 400 ms dwell time. Every uplink the module
+  accepted is charged, failed or timed out ones included, and the charges
+  are kept in the outbox DB so a restart does not reset the budget
+- Pack everything pending behind the next event into one multi-event frame
+  (event_frame), bounded by the current DR's maximum payload, so bursts
+  share one uplink's MAC overhead and airtime; events are written with
+  pack_into straight into one preallocated frame buffer
+- Optionally (PACKED_ENABLED) encode each event with its bit-packed layout
+- Optionally (COMPACT_ENABLED) send multi-event uplinks as compact frames
+  (varint time offsets, delta-coded weather/telemetry with keyframes)
+- When species_dictionary.json is deployed (DICTIONARY_ENABLED), send
+  detections of dictionary species as 1-byte-coded avis_dict_events on the
+  dictionary's FPort, announcing (version, fingerprint) at startup and
+  every DICTIONARY_ANNOUNCE_SEC; not combined with PACKED_ENABLED, whose
+  6-byte avis layout is already smaller
+- Keep per-uplink latency/TX-duration statistics (last_tx, stats())
+- Re-open the port after a serial failure
+
+Usage:
+    from radio_service import get_radio_service
+    radio = get_radio_service()          # started on first use
+    radio.submit(event_dict)             # persists; never waits on the radio
+    radio.stop()                         # sends what it can, closes UART
+"""
+
+import threading
+import time
+
+from protocol import Protocol
+from rui3_driver import RUI3Driver, SendRejected, TX_TIMEOUT_SEC
+from lora_params import max_payload
+from outbox import Outbox
+from uplink_scheduler import UplinkScheduler, SEND, DEFER
+
+
+UART_PORT = "/dev/ttyS0"
+LORA_FPORT = 1
+REOPEN_DELAY_SEC = 5
+
+FRAMING_ENABLED = True
+FRAME_LINGER_SEC = 1.0     # wait this long for a burst to fill a frame
+MAX_FRAME_EVENTS = 255
+FRAME_BUFFER_BYTES = 512   # largest FRMPayload (242 B) plus one oversized event
+COMPACT_ENABLED = False    # compact_frame encoding for multi-event uplinks
+PACKED_ENABLED = False     # bit-packed single events (avis 6 B instead of 8 B)
+DICTIONARY_ENABLED = True  # only takes effect if species_dictionary.json is present
+DICTIONARY_ANNOUNCE_SEC = 24 * 3600
+
+RETRY_BACKOFF_SEC = 5      # first retry delay after a failed uplink
+RETRY_BACKOFF_MAX_SEC = 300
+
+PRIORITIES = {
+    "dictionary_announce": 0,
+    "avis_event": 0,
+    "avis_summary_event": 0,
+    "weather_event": 1,
+    "telemetry_event": 2,
+}
+DEFAULT_PRIORITY = 3
+
+
+class RadioService:
+    def __init__(self, uart_port: str = UART_PORT, outbox: Outbox = None,
+                 scheduler: UplinkScheduler = None):
+        self.uart_port = uart_port
+        self._proto = Protocol()
+        self._outbox = outbox if outbox is not None else Outbox()
+        self.scheduler = scheduler if scheduler is not None else UplinkScheduler(store=self._outbox)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._abort = threading.Event()
+        self._driver = None
+        self._thread = None
+        self._next_tx_at = 0.0
+        self._backoff = 0.0
+        self.last_tx = None
+        self._sent = 0
+        self._events_sent = 0
+        self._failed = 0
+        self._dropped = 0
+        self._tx_time_total = 0.0
+        self._dict_fport = self._proto.dictionary_fport() if DICTIONARY_ENABLED and not PACKED_ENABLED else None
+        self._announce_lock = threading.Lock()
+        self._last_announce = None
+        self._frame_buf = bytearray(FRAME_BUFFER_BYTES)     # writer thread only
+        self._frame_view = memoryview(self._frame_buf)
+
+    # ─── Producer API ──────────────────────────────────────────────
+    def submit(self, event: dict, fport: int = LORA_FPORT):
+        """Persists an event in the outbox for transmission; never waits on the radio."""
+        priority = PRIORITIES.get(event.get("event_type"), DEFAULT_PRIORITY)
+        if self._dict_fport and fport == LORA_FPORT:
+            fport = self._dict_fport
+            self._maybe_announce()
+            event = self._proto.apply_dictionary(event)
+        self._outbox.put(event, priority, fport)
+        self._wakeup.set()
+
+    def _maybe_announce(self):
+        now = time.monotonic()
+        with self._announce_lock:
+            if self._last_announce is not None and now - self._last_announce < DICTIONARY_ANNOUNCE_SEC:
+                return
+            self._last_announce = now
+        announce = self._proto.dictionary_announce(int(time.time()))
+        self._outbox.put(announce, PRIORITIES["dictionary_announce"], self._dict_fport)
+
+    def pending(self) -> int:
+        return len(self._outbox)
+
+    def stats(self) -> dict:
+        return {
+            "sent": self._sent,
+            "events_sent": self._events_sent,
+            "failed": self._failed,
+            "dropped": self._dropped,
+            "outbox": self._outbox.stats(),
+            "airtime": self.scheduler.stats(),
+            "tx_time_total": round(self._tx_time_total, 3),
+            "last": repr(self.last_tx) if self.last_tx else None,
+        }
+
+    # ─── Lifecycle ─────────────────────────────────────────────────
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._abort.clear()
+        self._thread = threading.Thread(target=self._writer_loop, name="radio-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """
+        Keeps sending for up to `timeout` seconds while events are pending,
+        then closes the UART. Anything unsent stays in the outbox.
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._abort.set()
+            self._thread.join(TX_TIMEOUT_SEC)
+        self._close_driver()
+        if not (self._thread and self._thread.is_alive()):
+            self._outbox.close()
+
+    # ─── Writer Thread ─────────────────────────────────────────────
+    def _open_driver(self):
+        if self._driver is None:
+            self._driver = RUI3Driver(port=self.uart_port)
+        return self._driver
+
+    def _close_driver(self):
+        if self._driver is not None:
+            self._driver.close()
+            self._driver = None
+
+    def _wait_until(self, deadline: float) -> bool:
+        """Sleeps until the monotonic deadline; False if aborted meanwhile."""
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            return not self._abort.wait(delay)
+        return not self._abort.is_set()
+
+    def _writer_loop(self):
+        while not self._abort.is_set():
+            if not len(self._outbox):
+                if self._stopping.is_set():
+                    return
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            if not self._wait_until(self._next_tx_at):
+                return
+            rows = self._next_rows()
+            if not rows:
+                continue
+            fport = rows[0][1]
+            if not FRAMING_ENABLED:
+                rows = rows[:1]
+
+            if COMPACT_ENABLED:
+                ids, events, full = self._fill_compact(rows)
+                if len(events) == 1:
+                    payload = self._encode(events[0])
+                else:
+                    payload = self._proto.encode_compact(events) if events else b""
+            else:
+                ids, payload, full = self._fill_frame(rows)
+            if not payload:
+                continue
+
+            # coalescing only helps if more events can join this frame
+            full = full or not FRAMING_ENABLED or self._stopping.is_set()
+            action, delay = self.scheduler.decide(len(payload), full)
+            if action != SEND:
+                if action == DEFER:
+                    print(f"[radio_service] Airtime budget spent: deferring "
+                          f"{len(ids)} events for {delay:.0f}s")
+                self._next_tx_at = time.monotonic() + delay
+                continue
+            self._transmit(payload, fport, ids)
+
+    def _next_rows(self) -> list:
+        """Pending rows sharing the FPort of the next event, lingering for bursts."""
+        rows = self._outbox.peek(MAX_FRAME_EVENTS)
+        if FRAMING_ENABLED and len(rows) == 1 and FRAME_LINGER_SEC and not self._stopping.is_set():
+            if self._abort.wait(FRAME_LINGER_SEC):
+                return []
+            rows = self._outbox.peek(MAX_FRAME_EVENTS)
+        if not rows:
+            return []
+        return [row for row in rows if row[1] == rows[0][1]]
+
+    def _encode(self, event: dict) -> bytes:
+        if PACKED_ENABLED:
+            payload = self._proto.encode_packed(event)
+        else:
+            payload = self._proto.encode(event)
+        if not payload:
+            print(f"[radio_service] Dropping unencodable {event.get('event_type')}")
+        return payload
+
+    def _encode_into(self, offset: int, event: dict) -> int:
+        """Encodes an event into the frame buffer at offset; returns its length (0: unencodable)."""
+        if PACKED_ENABLED:
+            payload = self._proto.encode_packed(event)
+            self._frame_buf[offset:offset + len(payload)] = payload
+            n = len(payload)
+        else:
+            n = self._proto.encode_into(self._frame_buf, offset, event)
+        if not n:
+            print(f"[radio_service] Dropping unencodable {event.get('event_type')}")
+        return n
+
+    def _drop(self, ids: list):
+        self._dropped += len(ids)
+        self._outbox.ack(ids)
+
+    def _payload_limit(self) -> int:
+        return min(max_payload(), self.scheduler.max_payload())
+
+    def _fill_frame(self, rows: list):
+        """
+        Packs pending events (send order) into the frame buffer while they fit.
+        Returns (row ids, payload, full) where full means events were left behind.
+        A single event is sent as is, without a frame header.
+        """
+        ids, bad = [], []
+        overhead = self._proto.frame_overhead()
+        size = overhead
+        limit = self._payload_limit()
+
+        for row_id, _, event in rows:
+            n = self._encode_into(size, event)
+            if not n:
+                bad.append(row_id)
+                continue
+            if ids and size + n > limit:
+                break                          # no room: leads the next uplink
+            ids.append(row_id)
+            size += n
+
+        self._drop(bad)
+        full = len(ids) + len(bad) < len(rows) or len(ids) >= MAX_FRAME_EVENTS
+        if not ids:
+            return ids, b"", full
+        if len(ids) == 1:
+            return ids, bytes(self._frame_view[overhead:size]), full
+        self._proto.frame_header_into(self._frame_buf, len(ids))
+        return ids, bytes(self._frame_view[:size]), full
+
+    def _fill_compact(self, rows: list):
+        """Like _fill_frame, sizing candidates by trial compact encoding."""
+        ids, events, bad = [], [], []
+        limit = self._payload_limit()
+
+        for row_id, _, event in rows:
+            trial = self._proto.encode_compact(events + [event], commit=False)
+            if not trial:
+                print(f"[radio_service] Dropping unencodable {event.get('event_type')}")
+                bad.append(row_id)
+                continue
+            if events and len(trial) > limit:
+                break
+            ids.append(row_id)
+            events.append(event)
+
+        self._drop(bad)
+        return ids, events, len(ids) + len(bad) < len(rows) or len(ids) >= MAX_FRAME_EVENTS
+
+    def _transmit(self, payload: bytes, fport: int, ids: list):
+        try:
+            driver = self._open_driver()
+            print(f"Sending over LoRa: AT+SEND={fport}:{payload.hex().upper()}")
+            future = driver.send_uplink(fport, payload)
+        except Exception as e:
+            # port failure before the module took the command: nothing went on air
+            self._failed_uplink(ids, e)
+            self._reopen_later()
+            return
+        try:
+            result = future.result(timeout=TX_TIMEOUT_SEC)
+        except SendRejected as e:
+            # module answered but refused (busy, not joined, ...): port is fine
+            self._failed_uplink(ids, e)
+            return
+        except Exception as e:
+            # AT+SEND was accepted, so the module transmitted (or still is)
+            self.scheduler.record(len(payload))
+            self._failed_uplink(ids, e)
+            self._reopen_later()
+            return
+
+        self.last_tx = result
+        self._tx_time_total += result.tx_duration
+        self.scheduler.record(len(payload))
+        if result.ok:
+            self._sent += 1
+            self._events_sent += len(ids)
+            self._backoff = 0.0
+            self._outbox.ack(ids)
+        else:
+            self._failed_uplink(ids, result.status)
+        print("Module response:", result)
+
+    def _reopen_later(self):
+        self._close_driver()
+        self._next_tx_at = max(self._next_tx_at, time.monotonic() + REOPEN_DELAY_SEC)
+
+    def _failed_uplink(self, ids: list, reason):
+        self._failed += 1
+        self._proto.reset_compact()           # server never saw the deltas
+        self._outbox.fail(ids)
+        self._backoff = min(max(self._backoff * 2, RETRY_BACKOFF_SEC), RETRY_BACKOFF_MAX_SEC)
+        self._next_tx_at = max(self._next_tx_at, time.monotonic() + self._backoff)
+        print(f"[ERROR] LoRa transmission failed ({len(ids)} events kept for retry "
+              f"in {self._backoff:.0f}s): {reason}")
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_radio_service() -> RadioService:
+    """Returns the process-wide RadioService, starting it on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RadioService()
+            _service.start()
+        return _service
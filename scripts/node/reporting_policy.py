@@ -0,0 +1,144 @@
+"""
+reporting_policy.py
+-------------------
+
+Change-driven reporting for periodic samples (weather, telemetry).
+
+A stationary node's position and a calm day's weather barely change
+between 5-minute samples, yet every sample used to be sent. A
+ReportingPolicy compares each new sample with the last one that was
+*sent* (so slow drift still adds up to a report) and lets it through only
+if:
+
+- it is the first sample since startup
+- a field moved by at least its deadband (in the event's own units), or
+  the position moved by at least MOVE_DEADBAND_M
+- nothing has been sent for max_silence_sec (a heartbeat, so the server
+  can tell "unchanged" from "node down")
+
+Suppressed samples are not dropped: they are kept in a local store
+(an Outbox at SUPPRESSED_PATH, bounded like the uplink outbox) for later
+bulk upload, and counted in stats().
+
+Usage:
+    from reporting_policy import get_reporting_policy
+    policy = get_reporting_policy("weather_event")
+    if policy.should_send(event):
+        dispatch_event(event)
+    print(policy.stats())     # {"first": 1, "change": 3, "silence": 2, "suppressed": 60, "buffered": 60}
+"""
+
+import math
+import threading
+import time
+from pathlib import Path
+
+from outbox import Outbox
+
+
+SUPPRESSED_PATH = Path(__file__).resolve().parent.parent.parent / "data" / "suppressed.db"
+MAX_SUPPRESSED_BYTES = 1024 * 1024
+
+# weather_event units: temperature °C (whole degrees), humidity %, pressure hPa ×10
+WEATHER_DEADBANDS = {"temperature": 1, "humidity": 5, "pressure": 10}
+WEATHER_MAX_SILENCE_SEC = 60 * 60
+
+# telemetry_event units: lat/lon degrees ×1e5, alt m
+TELEMETRY_DEADBANDS = {"alt": 20}
+MOVE_DEADBAND_M = 10.0
+TELEMETRY_MAX_SILENCE_SEC = 6 * 60 * 60
+
+METERS_PER_DEG = 111_320.0
+
+
+class ReportingPolicy:
+    def __init__(self, name: str, deadbands: dict, max_silence_sec: float,
+                 move_deadband_m: float = None, store: Outbox = None):
+        self.name = name
+        self.deadbands = deadbands
+        self.max_silence_sec = max_silence_sec
+        self.move_deadband_m = move_deadband_m
+        self._store = store
+        self._lock = threading.Lock()
+        self._last_sent = None
+        self._last_sent_at = None
+        self.counts = {"first": 0, "change": 0, "silence": 0, "suppressed": 0}
+
+    def _moved_m(self, event: dict) -> float:
+        """Distance in metres between the event's lat/lon (×1e5) and the last sent one."""
+        last = self._last_sent
+        dlat = (event["lat"] - last["lat"]) / 1e5
+        dlon = (event["lon"] - last["lon"]) / 1e5 * math.cos(math.radians(last["lat"] / 1e5))
+        return math.hypot(dlat, dlon) * METERS_PER_DEG
+
+    def _reason(self, event: dict, now: float):
+        """Why the event should be sent, or None to suppress it (lock held)."""
+        if self._last_sent is None:
+            return "first"
+        for field, band in self.deadbands.items():
+            if abs(event.get(field, 0) - self._last_sent.get(field, 0)) >= band:
+                return "change"
+        if self.move_deadband_m is not None and self._moved_m(event) >= self.move_deadband_m:
+            return "change"
+        if now - self._last_sent_at >= self.max_silence_sec:
+            return "silence"
+        return None
+
+    def should_send(self, event: dict) -> bool:
+        """Decides for one sample; suppressed samples go to the local store."""
+        now = time.monotonic()
+        with self._lock:
+            reason = self._reason(event, now)
+            if reason is None:
+                self.counts["suppressed"] += 1
+            else:
+                self.counts[reason] += 1
+                self._last_sent = event
+                self._last_sent_at = now
+        if reason is None and self._store is not None:
+            try:
+                self._store.put(event, priority=0, fport=0)
+            except Exception as e:
+                print(f"[WARN] Could not buffer suppressed {self.name}: {e}")
+        return reason is not None
+
+    def stats(self) -> dict:
+        return {
+            **self.counts,
+            "buffered": len(self._store) if self._store is not None else 0,
+        }
+
+
+POLICIES = {
+    # event_type: (deadbands, max silence, movement deadband in metres)
+    "weather_event": (WEATHER_DEADBANDS, WEATHER_MAX_SILENCE_SEC, None),
+    "telemetry_event": (TELEMETRY_DEADBANDS, TELEMETRY_MAX_SILENCE_SEC, MOVE_DEADBAND_M),
+}
+
+_store = None
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_reporting_policy(event_type: str):
+    """Returns the process-wide ReportingPolicy for event_type (None if it has none)."""
+    global _store
+    if event_type not in POLICIES:
+        return None
+    with _policies_lock:
+        if event_type not in _policies:
+            if _store is None:
+                _store = Outbox(path=SUPPRESSED_PATH, max_bytes=MAX_SUPPRESSED_BYTES)
+            deadbands, silence, move_m = POLICIES[event_type]
+            _policies[event_type] = ReportingPolicy(event_type, deadbands, silence, move_m, _store)
+        return _policies[event_type]
+
+
+def close_reporting():
+    """Closes the suppressed-sample store."""
+    global _store
+    with _policies_lock:
+        if _store is not None:
+            _store.close()
+        _store = None
+        _policies.clear()
@@ -5,33 +5,102 @@ rui3_driver.py
 Provides a wrapper for communicating with a RAK RUI3-based LoRa module over UART
 using AT command strings.
 
-This driver is used by the send_over_lora module to transmit encoded payloads.
+This driver is used by the radio_service module to transmit encoded payloads.
+
+A reader thread parses the module's output stream incrementally:
+- Lines that answer the in-flight command are collected until OK/ERROR and
+  resolve that command's Future
+- "+EVT:" lines are asynchronous events: TX_DONE / SEND_CONFIRMED_OK /
+  SEND_CONFIRMED_FAILED resolve the in-flight uplink's Future; everything
+  else (RX data, join events, ...) goes to registered listeners
 
 Main class:
 - RUI3Driver(port="/dev/ttyS0", baudrate=115200, timeout=5.0)
 
 Methods:
-- send_cmd(at_cmd: str) → str: Sends an AT command and reads response
-- close()               → void: Closes the serial connection
+- command(at_cmd: str)            → Future[str]: response lines joined by '\n'
+- send_cmd(at_cmd: str)           → str: blocking command() (empty on timeout)
+- send_uplink(fport, payload)     → Future[TxResult]: resolves when the module
+                                    reports the transmission complete, or fails
+                                    with SendRejected if AT+SEND was refused
+                                    (nothing went on air)
+- add_listener(callback)          → callback(event: str) for other +EVT: lines
+- close()                         → void: Stops the reader, closes the serial port
 
 Usage:
     driver = RUI3Driver()
-    resp = driver.send_cmd("AT+SEND=1:112233")
+    result = driver.send_uplink(1, bytes.fromhex("112233")).result(timeout=30)
+    print(result.status, result.latency, result.tx_duration)
     driver.close()
 """
 
 import serial
+import threading
 import time
+from concurrent.futures import Future
+
+
+TX_EVENTS = ("TX_DONE", "SEND_CONFIRMED_OK", "SEND_CONFIRMED_FAILED")
+TX_TIMEOUT_SEC = 30.0
+
+
+class SendRejected(RuntimeError):
+    """The module did not accept AT+SEND (busy, not joined, ...); nothing was transmitted."""
+
+
+class TxResult:
+    """Outcome of one uplink, with timings measured on the node."""
+    __slots__ = ("status", "ok", "latency", "tx_duration", "payload_len")
+
+    def __init__(self, status: str, ok: bool, latency: float, tx_duration: float, payload_len: int):
+        self.status = status            # e.g. "TX_DONE", "SEND_CONFIRMED_FAILED(4)"
+        self.ok = ok
+        self.latency = latency          # AT+SEND written → completion event (s)
+        self.tx_duration = tx_duration  # module OK → completion event (s), includes RX windows
+        self.payload_len = payload_len
+
+    def __repr__(self):
+        return (f"<TxResult {self.status} {self.payload_len}B "
+                f"latency={self.latency:.3f}s tx={self.tx_duration:.3f}s>")
+
+
+class _Command:
+    __slots__ = ("future", "lines")
+
+    def __init__(self):
+        self.future = Future()
+        self.lines = []
+
+
+class _Uplink:
+    __slots__ = ("future", "sent_at", "accepted_at", "payload_len")
+
+    def __init__(self, payload_len: int):
+        self.future = Future()
+        self.sent_at = time.monotonic()
+        self.accepted_at = None
+        self.payload_len = payload_len
+
 
 class RUI3Driver:
     def __init__(self, port: str = '/dev/ttyS0', baudrate: int = 115200, timeout: float = 5.0):
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
-        self.ser = serial.Serial(port=self.port, baudrate=self.baudrate, timeout=0.5)
+        self.ser = serial.Serial(port=self.port, baudrate=self.baudrate, timeout=0.1)
         time.sleep(1)
         self._drain_buffers()
 
+        self._cmd_lock = threading.Lock()       # one AT command in flight
+        self._state_lock = threading.Lock()
+        self._command = None
+        self._uplink = None
+        self._listeners = []
+
+        self._running = True
+        self._reader = threading.Thread(target=self._reader_loop, name="rui3-reader", daemon=True)
+        self._reader.start()
+
     def _drain_buffers(self):
         """Flush input and output buffers."""
         try:
@@ -40,6 +109,78 @@ class RUI3Driver:
         except Exception:
             pass
 
+    # ─── Reader Thread ─────────────────────────────────────────────
+    def _reader_loop(self):
+        buf = b""
+        while self._running:
+            try:
+                chunk = self.ser.read(self.ser.in_waiting or 1)
+            except Exception as e:
+                if self._running:
+                    print(f"[rui3_driver] Serial read failed: {e}")
+                    self._fail_pending(e)
+                return
+            if not chunk:
+                continue
+            buf += chunk
+            while b"\n" in buf:
+                raw, buf = buf.split(b"\n", 1)
+                line = raw.decode("utf-8", errors="ignore").strip()
+                if line:
+                    self._handle_line(line)
+
+    def _handle_line(self, line: str):
+        if line.startswith("+EVT:"):
+            self._handle_event(line[5:])
+            return
+
+        with self._state_lock:
+            cmd = self._command
+            if cmd is None:
+                return  # unsolicited output (boot banner, echo after reset)
+            cmd.lines.append(line)
+            if line == 'OK' or 'ERROR' in line:
+                self._command = None
+                cmd.future.set_result('\n'.join(cmd.lines))
+
+    def _handle_event(self, evt: str):
+        if evt.startswith(TX_EVENTS):
+            with self._state_lock:
+                uplink, self._uplink = self._uplink, None
+            if uplink is not None and not uplink.future.done():
+                now = time.monotonic()
+                uplink.future.set_result(TxResult(
+                    status=evt,
+                    ok=not evt.startswith("SEND_CONFIRMED_FAILED"),
+                    latency=now - uplink.sent_at,
+                    tx_duration=now - (uplink.accepted_at or uplink.sent_at),
+                    payload_len=uplink.payload_len,
+                ))
+            return
+
+        for callback in list(self._listeners):
+            try:
+                callback(evt)
+            except Exception as e:
+                print(f"[rui3_driver] Event listener failed on {evt}: {e}")
+
+    def _fail_pending(self, exc: Exception):
+        with self._state_lock:
+            cmd, self._command = self._command, None
+            uplink, self._uplink = self._uplink, None
+        for pending in (cmd, uplink):
+            if pending is not None and not pending.future.done():
+                pending.future.set_exception(exc)
+
+    # ─── Commands ──────────────────────────────────────────────────
+    def command(self, at_cmd: str) -> Future:
+        """Writes an AT command; the Future resolves with the full response."""
+        cmd = _Command()
+        with self._state_lock:
+            self._command = cmd
+        self.ser.write((at_cmd.strip() + '\r\n').encode('utf-8'))
+        return cmd.future
+
     def send_cmd(self, at_cmd: str) -> str:
         """
         Send an AT command to the RUI3 module and wait for a response.
@@ -48,25 +189,60 @@ class RUI3Driver:
             at_cmd: Command string, e.g. "AT+SEND=1:112233"
 
         Returns:
-            Multiline string response from the module (joined by '\n')
+            Multiline string response from the module (joined by '\n'),
+            or an empty string if nothing complete arrived within the timeout
         """
-        cmd = at_cmd.strip() + '\r\n'
-        self._drain_buffers()
-        self.ser.write(cmd.encode('utf-8'))
-
-        deadline = time.time() + self.timeout
-        responses = []
-        while time.time() < deadline:
-            line = self.ser.readline().decode('utf-8', errors='ignore').strip()
-            if line:
-                responses.append(line)
-                if line == 'OK' or 'ERROR' in line:
-                    break
-        return '\n'.join(responses)
+        with self._cmd_lock:
+            future = self.command(at_cmd)
+            try:
+                return future.result(timeout=self.timeout)
+            except Exception:
+                with self._state_lock:
+                    partial = self._command.lines if self._command is not None else []
+                    self._command = None
+                return '\n'.join(partial)
+
+    def send_uplink(self, fport: int, payload: bytes, tx_timeout: float = TX_TIMEOUT_SEC) -> Future:
+        """
+        Sends payload with AT+SEND and returns a Future[TxResult] that resolves
+        on the module's TX_DONE / SEND_CONFIRMED_* event. Waits for any
+        previous uplink to complete first, so a TX is never started while
+        another one is still in flight.
+        """
+        previous = self._uplink
+        if previous is not None:
+            try:
+                previous.future.result(timeout=tx_timeout)
+            except Exception:
+                pass
+
+        uplink = _Uplink(len(payload))
+        with self._state_lock:
+            self._uplink = uplink
+
+        resp = self.send_cmd(f"AT+SEND={fport}:{payload.hex().upper()}")
+        if not resp.endswith('OK'):
+            with self._state_lock:
+                if self._uplink is uplink:
+                    self._uplink = None
+            uplink.future.set_exception(SendRejected(f"AT+SEND rejected: {resp or 'no response'}"))
+        else:
+            uplink.accepted_at = time.monotonic()
+        return uplink.future
+
+    def add_listener(self, callback):
+        """Registers callback(event_str) for +EVT: lines other than TX completion."""
+        self._listeners.append(callback)
 
     def close(self):
-        """Close the serial connection."""
+        """Stop the reader thread and close the serial connection."""
+        self._running = False
+        try:
+            self._reader.join(timeout=1)
+        except Exception:
+            pass
         try:
             self.ser.close()
         except Exception:
             pass
+        self._fail_pending(RuntimeError("RUI3 driver closed"))
@@ -16,33 +16,19 @@ The event dictionary must contain:
     - other fields:   required by Protocol for that event type
 
 Responsibilities:
-- Encodes the event using Protocol
-- Transmits it over UART using RUI3Driver and AT+SEND
+- Hands the event to the process-wide RadioService, which persists it in
+  the durable outbox, then encodes it with Protocol and transmits it over
+  UART (RUI3 AT+SEND) from a single writer thread that keeps the serial
+  port open; failed uplinks are retried instead of lost
 
 This script does not determine event type—it encodes what it’s given.
 """
 
-from protocol import Protocol
-from rui3_driver import RUI3Driver
+from radio_service import get_radio_service
 
 def send_event_over_lora(event: dict, port: int = 1):
-    """Encodes and sends an EnviroPulse event over LoRa via RUI3 AT+SEND."""
-    proto = Protocol()
-    
+    """Queues an EnviroPulse event for LoRa transmission via RUI3 AT+SEND."""
     try:
-        payload = proto.encode(event)
-    except Exception as e:
-        print(f"[ERROR] Protocol encoding failed: {e}")
-        return
-
-    hex_payload = payload.hex().upper()
-    at_cmd = f"AT+SEND={port}:{hex_payload}"
-
-    try:
-        driver = RUI3Driver()
-        print(f"Sending over LoRa: {at_cmd}")
-        resp = driver.send_cmd(at_cmd)
-        print("Module response:", resp)
-        driver.close()
+        get_radio_service().submit(event, fport=port)
     except Exception as e:
         print(f"[ERROR] LoRa transmission failed: {e}")
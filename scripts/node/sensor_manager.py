@@ -0,0 +1,167 @@
+"""
+sensor_manager.py
+-----------------
+
+Long-lived owner of the node's I2C bus and weather sensor handles.
+
+Opening busio.I2C and constructing a sensor object on every read costs a
+bus initialization each time, and for the DPS310 a reload of its
+calibration coefficients. The manager opens the bus once and keeps each
+initialized sensor for the process lifetime.
+
+Responsibilities:
+- Open the I2C bus lazily, once
+- Initialize each device on first use and cache the handle
+- Burst oversampling: read() takes BURST_SAMPLES measurements
+  BURST_INTERVAL_SEC apart and returns the per-channel median, so a single
+  glitched conversion does not reach the event
+- Recover per device: a failed measurement drops only that device's handle
+  and re-initializes it (DEVICE_RETRIES times) while the bus and the other
+  sensors stay as they are; only after BUS_RESET_AFTER consecutive failed
+  reads of the same device is the bus itself reopened
+- Keep per-device read/failure/re-init counts (stats())
+
+Devices:
+    "sht45"   → (temperature_C, humidity_percent)
+    "dps310"  → (pressure_hPa,)
+
+Usage:
+    from sensor_manager import get_sensor_manager
+    sensors = get_sensor_manager()
+    temp_c, rh = sensors.read("sht45")
+    (pressure,) = sensors.read("dps310")
+"""
+
+import threading
+import time
+from statistics import median
+
+import board
+import busio
+
+from sht45_driver import open_sht45, measure_sht45
+from dps310_driver import open_dps310, measure_dps310
+
+
+BURST_SAMPLES = 5
+BURST_INTERVAL_SEC = 0.1
+DEVICE_RETRIES = 1         # re-initializations of a failed device per read()
+BUS_RESET_AFTER = 3        # consecutive failed reads of one device before reopening the bus
+
+DEVICES = {
+    # name: (open(i2c) → handle, measure(handle) → float or tuple of floats)
+    "sht45": (open_sht45, measure_sht45),
+    "dps310": (open_dps310, measure_dps310),
+}
+
+
+class _Device:
+    __slots__ = ("name", "open", "measure", "handle", "reads", "failures", "reinits", "failed_run")
+
+    def __init__(self, name: str, open_fn, measure_fn):
+        self.name = name
+        self.open = open_fn
+        self.measure = measure_fn
+        self.handle = None
+        self.reads = 0
+        self.failures = 0
+        self.reinits = 0
+        self.failed_run = 0
+
+
+class SensorManager:
+    def __init__(self, devices: dict = None):
+        self._lock = threading.Lock()
+        self._i2c = None
+        self._devices = {name: _Device(name, *fns) for name, fns in (devices or DEVICES).items()}
+        self.bus_resets = 0
+
+    # ─── Bus and Handles ───────────────────────────────────────────
+    def _bus(self):
+        if self._i2c is None:
+            self._i2c = busio.I2C(board.SCL, board.SDA)
+        return self._i2c
+
+    def _close_bus(self):
+        if self._i2c is not None:
+            try:
+                self._i2c.deinit()
+            except Exception:
+                pass
+            self._i2c = None
+        for dev in self._devices.values():
+            dev.handle = None
+
+    def _handle(self, dev: _Device):
+        if dev.handle is None:
+            dev.handle = dev.open(self._bus())
+        return dev.handle
+
+    def _measure(self, dev: _Device) -> tuple:
+        value = dev.measure(self._handle(dev))
+        return value if isinstance(value, tuple) else (value,)
+
+    # ─── Reading ───────────────────────────────────────────────────
+    def read(self, name: str, samples: int = BURST_SAMPLES,
+             interval: float = BURST_INTERVAL_SEC) -> tuple:
+        """
+        Per-channel median of a burst of `samples` measurements.
+        Raises if no measurement of the burst succeeded.
+        """
+        dev = self._devices[name]
+        with self._lock:
+            burst, error = [], None
+            retries = DEVICE_RETRIES
+            while len(burst) < samples:
+                if burst:
+                    time.sleep(interval)
+                try:
+                    burst.append(self._measure(dev))
+                except Exception as e:
+                    error = e
+                    dev.handle = None       # re-initialize this device only
+                    if retries <= 0:
+                        break
+                    retries -= 1
+                    dev.reinits += 1
+
+            if not burst:
+                dev.failures += 1
+                dev.failed_run += 1
+                if dev.failed_run >= BUS_RESET_AFTER:
+                    print(f"[WARN] {name}: {dev.failed_run} failed reads in a row, reopening I2C bus")
+                    self._close_bus()
+                    self.bus_resets += 1
+                    dev.failed_run = 0
+                raise RuntimeError(f"{name} read failed: {error}")
+
+            dev.reads += 1
+            dev.failed_run = 0
+            return tuple(median(channel) for channel in zip(*burst))
+
+    # ─── Lifecycle ─────────────────────────────────────────────────
+    def close(self):
+        with self._lock:
+            self._close_bus()
+
+    def stats(self) -> dict:
+        return {
+            "bus_resets": self.bus_resets,
+            **{
+                name: {"reads": d.reads, "failures": d.failures, "reinits": d.reinits}
+                for name, d in self._devices.items()
+            },
+        }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_sensor_manager() -> SensorManager:
+    """Returns the process-wide SensorManager."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SensorManager()
+        return _manager
@@ -4,7 +4,10 @@ sht45_driver.py
 Reads temperature (°C) and humidity (%) from an SHT45/SHT4x.
 
 Usage:
-    temp_c, rh = read_sht45()
+    temp_c, rh = read_sht45()              # one-shot: opens the bus each call
+
+    sensor = open_sht45(i2c)               # long-lived handle (sensor_manager.py)
+    temp_c, rh = measure_sht45(sensor)
 """
 
 import board
@@ -12,9 +15,18 @@ import busio
 import adafruit_sht4x
 
 
+def open_sht45(i2c, address: int = 0x44):
+    """Initializes the sensor on an already open bus."""
+    return adafruit_sht4x.SHT4x(i2c, address=address)
+
+
+def measure_sht45(sensor):
+    """Return (temperature_C, humidity_percent). Raises on I2C failure."""
+    t_c, rh = sensor.measurements  # triggers a read
+    return float(t_c), float(rh)
+
+
 def read_sht45(address: int = 0x44):
     """Return (temperature_C, humidity_percent). Raises on I2C failure."""
     i2c = busio.I2C(board.SCL, board.SDA)
-    sensor = adafruit_sht4x.SHT4x(i2c, address=address)
-    t_c, rh = sensor.measurements  # triggers a read
-    return float(t_c), float(rh)
\ No newline at end of file
+    return measure_sht45(open_sht45(i2c, address))
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+task_scheduler.py
+-----------------
+
+Deadline scheduler for the node's periodic work (weather and telemetry
+sampling), replacing a loop that woke every second to compare
+time.time() against next_* timestamps.
+
+Behavior:
+- Timers live in a heap ordered by monotonic deadline; run() sleeps until
+  the earliest one and wakes for a due deadline or a newly added task.
+  stop() only sets a flag (Event.set() takes a lock, which a signal handler
+  must not do while run() may hold it), so each sleep is capped at
+  STOP_CHECK_SEC to notice it
+- Fixed-rate, drift-free schedules: the next deadline is the previous
+  deadline + interval, not "finished + interval", so run time and late
+  wakeups never accumulate. After a stall longer than an interval (e.g.
+  a suspended system) the missed slots are skipped, not replayed in a burst
+- Due tasks run concurrently on a small worker pool, so a slow sampler
+  (GPS, a hung I2C read) cannot delay the others
+- Per-task timeout: a run still busy `timeout` seconds after it started is
+  reported; a task is never started again while its previous run is still
+  going (counted as an overrun)
+- Per-task statistics: runs, failures, timeouts, overruns, last duration,
+  worst start lateness
+
+Usage:
+    from task_scheduler import TaskScheduler
+    scheduler = TaskScheduler()
+    scheduler.every("weather", 300, sample_weather, timeout=60)
+    scheduler.run()          # blocks until scheduler.stop() (safe from a signal handler,
+                             # returns within STOP_CHECK_SEC)
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+MAX_WORKERS = 4
+STOP_CHECK_SEC = 1.0       # longest sleep before run() checks the stop flag
+
+
+class _Task:
+    __slots__ = ("name", "interval", "fn", "timeout", "future", "started",
+                 "runs", "failures", "timeouts", "overruns", "last_duration", "max_lateness")
+
+    def __init__(self, name: str, interval: float, fn, timeout: float):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.timeout = timeout
+        self.future = None
+        self.started = None
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.overruns = 0
+        self.last_duration = None
+        self.max_lateness = 0.0
+
+    def busy(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+
+_RUN = 0
+_CHECK_TIMEOUT = 1
+
+
+class TaskScheduler:
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self._heap = []                     # (deadline, seq, kind, task)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._tasks = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task")
+
+    # ─── Registration ──────────────────────────────────────────────
+    def every(self, name: str, interval: float, fn, timeout: float = None, first_delay: float = 0.0):
+        """Runs fn() every `interval` seconds (fixed rate), first after first_delay."""
+        task = _Task(name, interval, fn, timeout)
+        with self._lock:
+            self._tasks[name] = task
+            self._push(time.monotonic() + first_delay, _RUN, task)
+        self._wakeup.set()
+        return task
+
+    def _push(self, deadline: float, kind: int, task: _Task):
+        heapq.heappush(self._heap, (deadline, next(self._seq), kind, task))
+
+    # ─── Main Loop ─────────────────────────────────────────────────
+    def run(self):
+        """Dispatches deadlines until stop() is called."""
+        while not self._stopping:
+            with self._lock:
+                deadline = self._heap[0][0] if self._heap else None
+            delay = STOP_CHECK_SEC if deadline is None else deadline - time.monotonic()
+            if delay > 0:
+                self._wakeup.wait(min(delay, STOP_CHECK_SEC))
+                self._wakeup.clear()
+                continue
+
+            with self._lock:
+                deadline, _, kind, task = heapq.heappop(self._heap)
+                if kind == _RUN:
+                    self._push(self._next_deadline(deadline, task.interval), _RUN, task)
+            if kind == _RUN:
+                self._start(task, deadline)
+            else:
+                self._check_timeout(task)
+
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self):
+        """
+        Makes run() return within STOP_CHECK_SEC. Only assigns a flag (no
+        Event.set(), no locks), so it is safe in a signal handler.
+        """
+        self._stopping = True
+
+    @staticmethod
+    def _next_deadline(deadline: float, interval: float) -> float:
+        """deadline + interval, skipping slots that already passed."""
+        nxt = deadline + interval
+        now = time.monotonic()
+        if nxt <= now:
+            nxt += math.ceil((now - nxt) / interval) * interval
+        return nxt
+
+    # ─── Task Runs ─────────────────────────────────────────────────
+    def _start(self, task: _Task, deadline: float):
+        if task.busy():
+            task.overruns += 1
+            print(f"[WARN] {task.name}: previous run still busy, skipping this slot")
+            return
+        now = time.monotonic()
+        task.max_lateness = max(task.max_lateness, now - deadline)
+        task.started = now
+        task.future = self._pool.submit(self._call, task)
+        if task.timeout is not None:
+            with self._lock:
+                self._push(now + task.timeout, _CHECK_TIMEOUT, task)
+
+    def _call(self, task: _Task):
+        start = time.monotonic()
+        try:
+            task.fn()
+        except Exception as e:
+            task.failures += 1
+            print(f"[ERROR] Task {task.name} failed: {e}")
+        finally:
+            task.runs += 1
+            task.last_duration = time.monotonic() - start
+
+    def _check_timeout(self, task: _Task):
+        if task.busy() and time.monotonic() - task.started >= task.timeout:
+            task.timeouts += 1
+            print(f"[WARN] {task.name}: still running after {task.timeout:g}s timeout")
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "runs": t.runs,
+                "failures": t.failures,
+                "timeouts": t.timeouts,
+                "overruns": t.overruns,
+                "last_duration": round(t.last_duration, 3) if t.last_duration is not None else None,
+                "max_lateness": round(t.max_lateness, 3),
+            }
+            for name, t in self._tasks.items()
+        }
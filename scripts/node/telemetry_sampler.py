@@ -1,7 +1,11 @@
 """
 telemetry_sampler.py
 --------------------------
-Takes a single GPS fix and creates a structured TelemetryEvent.
+Creates a structured TelemetryEvent from the node's streaming position
+estimate (gps_calibrator.py), which averages the background GPS reader's
+fixes with outlier rejection. Before the first accepted fix it falls back
+to the latest raw fix from gps_service.py; a fix older than FIX_MAX_AGE_SEC
+counts as no fix. Sampling is an instant read either way.
 
 Attributes:
 - event_type: "telemetry_event"
@@ -9,40 +13,63 @@ Attributes:
 - lon:        float (decimal degrees)
 - alt:        float (meters)
 - time:       int (epoch seconds)
+- hdop:       float or None (horizontal dilution of precision, local only)
+- satellites: int or None (satellites in use, local only)
+- error_m:    float or None (horizontal standard error of the estimate, local only)
 - target:     "send_over_lora"
 
 Usage:
     from telemetry_sampler import TelemetryEvent
-    event = TelemetryEvent.from_gps()
+    event = TelemetryEvent.from_gps()              # never blocks
+    event = TelemetryEvent.from_gps(wait=60)       # one-shot: wait for a fix
 """
 
 import time
-from gps_driver import read_gps_fix
+from gps_service import get_gps_service, FIX_MAX_AGE_SEC
+from gps_calibrator import get_position_estimator
 from debug_logger import log_debug, log_error
 
 class TelemetryEvent:
-    def __init__(self, lat: float, lon: float, alt: float, timestamp: int, target: str = "send_over_lora"):
+    __slots__ = ("event_type", "lat", "lon", "alt", "time", "target", "hdop", "satellites", "error_m")
+
+    def __init__(self, lat: float, lon: float, alt: float, timestamp: int, target: str = "send_over_lora",
+                 hdop: float = None, satellites: int = None, error_m: float = None):
         self.event_type = "telemetry_event"
         self.lat = lat
         self.lon = lon
         self.alt = alt
         self.time = timestamp
         self.target = target
+        self.hdop = hdop
+        self.satellites = satellites
+        self.error_m = error_m
 
     @classmethod
-    def from_gps(cls):
-        """Takes a single GPS reading (non-blocking)."""
+    def from_gps(cls, max_age: float = FIX_MAX_AGE_SEC, wait: float = 0):
+        """Reads the position estimate or cached GPS fix (non-blocking unless wait > 0)."""
         try:
-            lat, lon, alt = read_gps_fix(timeout_sec=60)
-            if not all(isinstance(x, float) for x in (lat, lon, alt)):
-                raise ValueError("Invalid GPS fix type")
-            log_debug(f"GPS fix acquired: lat={lat:.6f}, lon={lon:.6f}, alt={alt:.1f}")
+            estimator = get_position_estimator()
+            fix = get_gps_service().latest(max_age=max_age, wait=wait)
+            pos = estimator.estimate()
         except Exception as e:
-            log_error(f"Failed to read GPS fix: {e}")
-            lat, lon, alt = 0.0, 0.0, 0.0
+            log_error(f"GPS service unavailable: {e}")
+            fix = pos = None
+
+        hdop = fix.hdop if fix else None
+        satellites = fix.satellites if fix else None
+        if pos is not None:
+            log_debug(f"GPS estimate: {pos!r}")
+            return cls(lat=pos.lat, lon=pos.lon, alt=pos.alt, timestamp=int(time.time()),
+                       hdop=hdop, satellites=satellites, error_m=pos.horizontal_m)
+
+        if fix is None:
+            log_error(f"No GPS fix newer than {max_age}s")
+            return cls(lat=0.0, lon=0.0, alt=0.0, timestamp=int(time.time()))
 
-        timestamp = int(time.time())
-        return cls(lat=lat, lon=lon, alt=alt, timestamp=timestamp)
+        log_debug(f"GPS fix: lat={fix.lat:.6f}, lon={fix.lon:.6f}, alt={fix.alt:.1f}, "
+                  f"hdop={fix.hdop}, sats={fix.satellites}, age={fix.age:.1f}s")
+        return cls(lat=fix.lat, lon=fix.lon, alt=fix.alt, timestamp=fix.timestamp,
+                   hdop=fix.hdop, satellites=fix.satellites)
 
     def __repr__(self):
         return (f"<TelemetryEvent lat={self.lat:.6f}, lon={self.lon:.6f}, "
@@ -0,0 +1,184 @@
+"""
+uplink_scheduler.py
+-------------------
+
+Airtime budget for the node's uplinks.
+
+Every uplink's time on air is computed from its payload length and the
+configured data rate (lora_params.airtime: SF, BW, CR, LoRaWAN overhead)
+and charged against rolling hourly and daily budgets. Before each uplink
+the radio writer asks decide() what to do:
+
+- SEND      → the frame fits the remaining budget (or is full, or has been
+              held for COALESCE_MAX_SEC) and can go now
+- COALESCE  → the budget is getting tight (below COALESCE_BELOW of either
+              window) and the frame still has room: hold it briefly so more
+              events share one uplink's preamble and LoRaWAN overhead
+- DEFER     → the frame would exceed a budget: wait until enough past
+              airtime ages out of the window
+
+The defaults follow the common 30 s/day fair-use airtime policy, with an
+hourly cap that keeps one burst of detections from spending the whole day.
+
+remaining() / budget_fraction() expose what is left, so other stages
+(reporting policies, aggregation windows) can adapt their rate.
+
+With a store (the radio's Outbox), every charge is also persisted and the
+last day of charges is reloaded at startup, so a restart does not hand out
+a fresh budget.
+
+Usage:
+    from uplink_scheduler import UplinkScheduler, SEND
+    sched = UplinkScheduler(store=outbox)
+    action, delay = sched.decide(len(payload), frame_full=False)
+    if action == SEND:
+        ...transmit...
+        sched.record(len(payload))
+"""
+
+import threading
+import time
+from collections import deque
+
+from lora_params import CURRENT_DR, MAX_DWELL_SEC, airtime, max_payload_for_airtime
+
+
+HOURLY_AIRTIME_SEC = 6.0
+DAILY_AIRTIME_SEC = 30.0
+COALESCE_BELOW = 0.5       # start holding frames when less than this fraction remains
+COALESCE_SEC = 30.0        # hold time per coalesce decision
+COALESCE_MAX_SEC = 300.0   # never hold the same backlog longer than this
+
+SEND = "send"
+COALESCE = "coalesce"
+DEFER = "defer"
+
+_WINDOWS = {"hour": 3600.0, "day": 86400.0}
+
+
+class UplinkScheduler:
+    def __init__(self, hourly_sec: float = HOURLY_AIRTIME_SEC,
+                 daily_sec: float = DAILY_AIRTIME_SEC, dr: int = CURRENT_DR, store=None):
+        self.dr = dr
+        self.budgets = {"hour": hourly_sec, "day": daily_sec}
+        self._store = store
+        self._lock = threading.Lock()
+        self._log = {w: deque() for w in _WINDOWS}   # (monotonic time, airtime) per window
+        self._used = {w: 0.0 for w in _WINDOWS}
+        self._hold_since = None
+        self.counts = {SEND: 0, COALESCE: 0, DEFER: 0}
+        if store is not None:
+            self._load()
+
+    def _load(self):
+        """Reloads the persisted charges of the longest window."""
+        wall, now = time.time(), time.monotonic()
+        try:
+            rows = self._store.airtime_log(wall - max(_WINDOWS.values()))
+        except Exception as e:
+            print(f"[WARN] Could not load airtime log: {e}")
+            return
+        with self._lock:
+            for at, t_air in rows:
+                for w in _WINDOWS:
+                    self._log[w].append((now - max(wall - at, 0.0), t_air))
+                    self._used[w] += t_air
+            self._expire(now)
+        if rows:
+            print(f"[uplink_scheduler] Reloaded {len(rows)} airtime charges "
+                  f"({self._used['day']:.1f}s in the last day)")
+
+    # ─── Airtime ───────────────────────────────────────────────────
+    def airtime(self, payload_len: int) -> float:
+        return airtime(payload_len, self.dr)
+
+    def max_payload(self) -> int:
+        """Largest FRMPayload that respects the dwell-time limit at this DR."""
+        return max_payload_for_airtime(MAX_DWELL_SEC, self.dr)
+
+    # ─── Rolling Windows ───────────────────────────────────────────
+    def _expire(self, now: float):
+        """Drops airtime older than each window (lock held)."""
+        for w, span in _WINDOWS.items():
+            log = self._log[w]
+            while log and now - log[0][0] >= span:
+                self._used[w] -= log.popleft()[1]
+
+    def record(self, payload_len: int, now: float = None) -> float:
+        """Charges one transmitted uplink against the budgets; returns its airtime."""
+        now = time.monotonic() if now is None else now
+        t_air = self.airtime(payload_len)
+        with self._lock:
+            self._expire(now)
+            for w in _WINDOWS:
+                self._log[w].append((now, t_air))
+                self._used[w] += t_air
+        if self._store is not None:
+            try:
+                self._store.record_airtime(time.time(), t_air)
+            except Exception as e:
+                print(f"[WARN] Could not persist airtime: {e}")
+        return t_air
+
+    def remaining(self, now: float = None) -> dict:
+        """Airtime seconds left in each window, e.g. {"hour": 4.2, "day": 27.9}."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+            return {w: max(self.budgets[w] - self._used[w], 0.0) for w in _WINDOWS}
+
+    def budget_fraction(self, now: float = None) -> float:
+        """Fraction (0–1) of the tighter of the two budgets still available."""
+        left = self.remaining(now)
+        return min(left[w] / self.budgets[w] for w in _WINDOWS)
+
+    def _wait_for(self, window: str, needed: float, now: float) -> float:
+        """Seconds until `needed` airtime has aged out of the window (lock held)."""
+        freed = 0.0
+        for t, t_air in self._log[window]:
+            freed += t_air
+            if freed >= needed:
+                return t + _WINDOWS[window] - now
+        return _WINDOWS[window]
+
+    # ─── Decisions ─────────────────────────────────────────────────
+    def decide(self, payload_len: int, frame_full: bool = False, now: float = None):
+        """Returns (SEND | COALESCE | DEFER, seconds to wait before asking again)."""
+        now = time.monotonic() if now is None else now
+        t_air = self.airtime(payload_len)
+        with self._lock:
+            self._expire(now)
+            over = {
+                w: t_air - (self.budgets[w] - self._used[w])
+                for w in _WINDOWS
+                if self._used[w] + t_air > self.budgets[w]
+            }
+            if over:
+                delay = max(self._wait_for(w, need, now) for w, need in over.items())
+                action = DEFER
+            else:
+                tight = any(
+                    (self.budgets[w] - self._used[w] - t_air) < COALESCE_BELOW * self.budgets[w]
+                    for w in _WINDOWS
+                )
+                held = now - self._hold_since if self._hold_since is not None else 0.0
+                if tight and not frame_full and held < COALESCE_MAX_SEC:
+                    action = COALESCE
+                    delay = min(COALESCE_SEC, COALESCE_MAX_SEC - held)
+                else:
+                    action, delay = SEND, 0.0
+
+            if action == SEND:
+                self._hold_since = None
+            elif self._hold_since is None:
+                self._hold_since = now
+            self.counts[action] += 1
+        return action, max(delay, 0.0)
+
+    def stats(self) -> dict:
+        left = self.remaining()
+        return {
+            "remaining_sec": {w: round(v, 3) for w, v in left.items()},
+            "budget_sec": dict(self.budgets),
+            "decisions": dict(self.counts),
+        }
@@ -2,7 +2,9 @@
 weather_sampler.py
 -----------------------
 
-Builds a structured WeatherEvent using SHT31 and BMP390 sensor drivers.
+Builds a structured WeatherEvent from the SHT45 and DPS310 sensors, read
+through the long-lived I2C sensor manager (sensor_manager.py) as median
+filtered bursts.
 
 Attributes:
 - event_type:   "weather_event"
@@ -18,10 +20,11 @@ Usage:
 """
 
 import time
-from sht45_driver import read_sht45  # returns (temp: float, humidity: float)
-from dps310_driver import read_dps310  # returns pressure: float
+from sensor_manager import get_sensor_manager
 
 class WeatherEvent:
+    __slots__ = ("event_type", "temperature", "humidity", "pressure", "timestamp", "target")
+
     def __init__(self, temperature: int, humidity: int, pressure: int, timestamp: int, target: str = "send_over_lora"):
         self.event_type  = "weather_event"
         self.temperature = temperature    # °C ×2 → int8
@@ -34,8 +37,9 @@ class WeatherEvent:
     def from_sensors(cls):
         """Attempts to read all sensors and return a structured event."""
         try:
-            temp, humidity = read_sht45()
-            pressure = read_dps310()
+            sensors = get_sensor_manager()
+            temp, humidity = sensors.read("sht45")
+            (pressure,) = sensors.read("dps310")
             timestamp = int(time.time())
 
             return cls(
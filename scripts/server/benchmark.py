@@ -0,0 +1,300 @@
+"""
+benchmark.py
+------------
+
+Microbenchmarks for the EnviroPulse gateway hot paths, fed with realistic
+payloads rebuilt from the daily JSON logs in EP/logs/.
+
+Covered:
+- protocol.encode          ← Protocol.encode on logged decoded events
+- protocol.decode          ← Protocol.decode on logged decrypted FRMPayloads
+- decrypt_frmpayload       ← AES FRMPayload decryption with registry AppSKeys
+- lora_event               ← full LoRaEvent construction from a rebuilt rxpk
+- extract_json_segment     ← PUSH_DATA datagram → JSON
+- logger.write_event       ← daily log append into a pre-seeded temp log
+
+Output:
+- A JSON document (stdout or --output) with per-benchmark median/min/p95
+  microseconds per operation plus host information
+- Optional comparison against a stored baseline file, keyed by machine
+  (e.g. "x86_64" on a laptop, "aarch64" on the Pi), so one file serves both
+
+Exit status is 1 when any benchmark is slower than its baseline median by
+more than --threshold (fraction, default 0.20).
+
+Usage:
+    python3 benchmark.py                          # run + compare to baseline
+    python3 benchmark.py --quick                  # fewer rounds (Pi)
+    python3 benchmark.py --save-baseline          # record this host's numbers
+    python3 benchmark.py --output results.json
+"""
+
+import argparse
+import base64
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from protocol import Protocol
+from udp_listener import UDPListener
+from udp_logger import Logger
+
+
+# ─── Configurable Paths ─────────────────────────────────────────────
+BASE_DIR = Path(__file__).resolve().parent
+LOG_PATH = BASE_DIR.parent.parent / "logs"
+REGISTRY_PATH = BASE_DIR / "node_registry.json"
+BASELINE_PATH = BASE_DIR / "benchmark_baseline.json"
+
+DEFAULT_ROUNDS = 30
+QUICK_ROUNDS = 8
+DEFAULT_THRESHOLD = 0.20
+
+
+# ─── Payload Loading ───────────────────────────────────────────────
+def load_logged_events(log_dir: Path = LOG_PATH) -> list:
+    """Returns every logged event (excluding decode errors) from all daily logs."""
+    events = []
+    for path in sorted(Path(log_dir).glob("*.json")):
+        try:
+            events.extend(json.loads(path.read_text()))
+        except Exception as e:
+            print(f"[benchmark] Skipping {path.name}: {e}", file=sys.stderr)
+    return [e for e in events if e.get("event_type") != "decode_error"]
+
+
+def build_phy_payload(event: dict) -> bytes:
+    """Rebuilds the LoRaWAN PHYPayload (unconfirmed uplink) for a logged event."""
+    return (
+        b"\x40" +
+        bytes.fromhex(event["devaddr"])[::-1] +
+        b"\x00" +
+        int(event["fcnt"]).to_bytes(2, "little") +
+        bytes([event["fport"]]) +
+        bytes.fromhex(event["encrypted_frm"]) +
+        bytes.fromhex(event["mic"])
+    )
+
+
+def build_rxpk(event: dict) -> dict:
+    """Builds a Semtech rxpk object resembling what the gateway forwards."""
+    phy = build_phy_payload(event)
+    return {
+        "tmst": 3512348611,
+        "chan": 2,
+        "rfch": 0,
+        "freq": 903.9,
+        "stat": 1,
+        "modu": "LORA",
+        "datr": "SF7BW125",
+        "codr": "4/5",
+        "rssi": -61,
+        "lsnr": 9.5,
+        "size": len(phy),
+        "data": base64.b64encode(phy).decode("ascii"),
+    }
+
+
+def build_push_data(event: dict) -> bytes:
+    """Builds a PUSH_DATA datagram: 12-byte header + rxpk JSON."""
+    header = bytes([0x02, 0x1A, 0x2B, 0x00]) + bytes.fromhex("B827EBFFFE000001")
+    return header + json.dumps({"rxpk": [build_rxpk(event)]}).encode("utf-8")
+
+
+# ─── Timing Harness ────────────────────────────────────────────────
+def time_per_op(func, items: list, rounds: int, setup=None) -> dict:
+    """
+    Runs func(item) over all items `rounds` times and returns microseconds
+    per operation statistics across rounds.
+    """
+    samples = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed / len(items) * 1e6)
+
+    samples.sort()
+    return {
+        "ops_per_round": len(items),
+        "rounds": rounds,
+        "median_us": round(statistics.median(samples), 3),
+        "min_us": round(samples[0], 3),
+        "p95_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+
+
+# ─── Benchmarks ────────────────────────────────────────────────────
+def bench_protocol(events: list, rounds: int) -> dict:
+    proto = Protocol()
+    payloads = [bytes.fromhex(e["decrypted_hex"]) for e in events]
+    return {
+        "protocol.encode": time_per_op(proto.encode, events, rounds),
+        "protocol.decode": time_per_op(proto.decode, payloads, rounds),
+    }
+
+
+def bench_crypto(events: list, registry: dict, rounds: int) -> dict:
+    from lorawan_decryptor import decrypt_frmpayload  # needs pycryptodome
+
+    args = [
+        (registry[e["devaddr"]]["appskey"], e["devaddr"], e["fcnt"], e["encrypted_frm"])
+        for e in events if e["devaddr"] in registry
+    ]
+    return {
+        "decrypt_frmpayload": time_per_op(
+            lambda a: decrypt_frmpayload(a[0], a[1], a[2], 0, a[3]), args, rounds
+        ),
+    }
+
+
+def bench_lora_event(events: list, registry: dict, rounds: int) -> dict:
+    from udp_decoder import LoRaEvent  # needs pycryptodome
+
+    rxpks = [build_rxpk(e) for e in events if e["devaddr"] in registry]
+    return {
+        "lora_event": time_per_op(lambda r: LoRaEvent(r, registry).to_dict(), rxpks, rounds),
+    }
+
+
+def bench_extract_json(events: list, rounds: int) -> dict:
+    listener = UDPListener.__new__(UDPListener)  # no socket bind needed
+    datagrams = [build_push_data(e) for e in events]
+    return {
+        "extract_json_segment": time_per_op(listener.extract_json_segment, datagrams, rounds),
+    }
+
+
+def bench_logger(events: list, rounds: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = Logger(base_dir=tmp)
+        seed = json.dumps(events, indent=2)
+
+        def reseed():
+            logger._get_today_path().write_text(seed)
+
+        return {
+            "logger.write_event": time_per_op(logger.write_event, events, rounds, setup=reseed),
+        }
+
+
+def run_all(rounds: int) -> dict:
+    events = load_logged_events()
+    if not events:
+        raise RuntimeError(f"No logged events found in {LOG_PATH}")
+
+    with open(REGISTRY_PATH) as f:
+        registry = json.load(f)
+
+    suites = [
+        ("protocol", lambda: bench_protocol(events, rounds)),
+        ("crypto", lambda: bench_crypto(events, registry, rounds)),
+        ("lora_event", lambda: bench_lora_event(events, registry, rounds)),
+        ("extract_json", lambda: bench_extract_json(events, rounds)),
+        ("logger", lambda: bench_logger(events, rounds)),
+    ]
+
+    results, skipped = {}, {}
+    for name, suite in suites:
+        try:
+            results.update(suite())
+        except ImportError as e:
+            skipped[name] = str(e)
+            print(f"[benchmark] Skipped {name}: {e}", file=sys.stderr)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "host": {
+            "machine": platform.machine(),
+            "node": platform.node(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "events": len(events),
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+# ─── Baseline Comparison ───────────────────────────────────────────
+def load_baseline(path: Path) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(report: dict, path: Path):
+    baseline = load_baseline(path)
+    baseline[report["host"]["machine"]] = {
+        "recorded_at": report["timestamp"],
+        "python": report["host"]["python"],
+        "median_us": {k: v["median_us"] for k, v in report["results"].items()},
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+    print(f"[benchmark] Baseline saved for {report['host']['machine']} → {path}", file=sys.stderr)
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """Returns a list of regression dicts; also annotates report['comparison']."""
+    host_baseline = baseline.get(report["host"]["machine"], {}).get("median_us", {})
+    comparison, regressions = {}, []
+
+    for name, stats in report["results"].items():
+        ref = host_baseline.get(name)
+        if not ref:
+            continue
+        ratio = stats["median_us"] / ref
+        entry = {"baseline_us": ref, "ratio": round(ratio, 3), "regressed": ratio > 1 + threshold}
+        comparison[name] = entry
+        if entry["regressed"]:
+            regressions.append({"name": name, **entry})
+
+    report["comparison"] = comparison
+    report["threshold"] = threshold
+    return regressions
+
+
+# ─── Main Entry Point ──────────────────────────────────────────────
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="EnviroPulse gateway microbenchmarks")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--quick", action="store_true", help=f"use {QUICK_ROUNDS} rounds")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", type=Path, help="write JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run_all(QUICK_ROUNDS if args.quick else args.rounds)
+
+    if args.save_baseline:
+        save_baseline(report, args.baseline)
+        regressions = []
+    else:
+        regressions = compare(report, load_baseline(args.baseline), args.threshold)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+
+    for r in regressions:
+        print(f"[benchmark] REGRESSION {r['name']}: {r['ratio']:.2f}× baseline "
+              f"({r['baseline_us']} µs)", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
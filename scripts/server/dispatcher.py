@@ -10,6 +10,11 @@ Responsibilities:
 - Decode incoming rxpk packets using the Protocol class
 - Log decoded results to date-based daily JSON log files
 - Dispatch events to appropriate internal subsystems (web_ingestor, weather, telemetry)
+- Persist weather/telemetry readings with rollups in the time-series store
+- Optionally mirror every decoded event into the queryable SQLite event store
+- Maintain per-node, per-species hourly occurrence aggregates
+- Keep each node's latest state in memory and serve it over local HTTP/JSON
+- Publish decoded events live over SSE (/events) and a Unix domain socket
 
 Stability:
 - Uses structured try/except blocks for pipeline fault tolerance
@@ -21,12 +26,20 @@ Dependencies:
 - udp_decoder.py       ← LoRaEvent class for parsing + decoding packets
 - udp_logger.py        ← Daily rotating log system
 - web_ingestor.py      ← Posts bird detections to your web API
+- timeseries_store.py  ← SQLite time-series store with 1m/1h/1d rollups
+- event_store.py       ← Optional normalized SQLite event sink
+- species_aggregator.py ← Incremental per-node species/hour aggregates
+- node_state.py        ← In-memory latest state per DevAddr
+- state_api.py         ← Local HTTP/JSON endpoint with ETag support + SSE
+- event_bus.py         ← In-process pub/sub with per-subscriber bounded buffers
+- event_stream.py      ← Newline-delimited JSON stream on a Unix socket
 - node_registry.json   ← AppSKey mapping for node DevAddr
 
 Location:
   Place this file in: EP/scripts/server/
 """
 
+import atexit
 import json
 from pathlib import Path
 from collections import deque
@@ -35,12 +48,24 @@ from udp_listener import UDPListener
 from udp_decoder import LoRaEvent
 from udp_logger import Logger
 from web_ingestor import ingest_avis_event
+from timeseries_store import TimeSeriesStore
+from event_store import EventStore
+from species_aggregator import SpeciesAggregator
+from node_state import NodeStateTable
+from state_api import start_state_api
+from event_bus import EventBus
+from event_stream import start_unix_stream
 
 
 # ─── Configurable Paths ─────────────────────────────────────────────
 BASE_DIR = Path(__file__).resolve().parent
 REGISTRY_PATH = BASE_DIR / "node_registry.json"
 LOG_PATH = BASE_DIR.parent.parent / "logs"
+DATA_PATH = BASE_DIR.parent.parent / "data"
+TIMESERIES_DB_PATH = DATA_PATH / "timeseries.db"
+EVENT_DB_PATH = DATA_PATH / "events.db"
+EVENT_STORE_ENABLED = False   # set True to mirror decoded events into SQLite
+SPECIES_AGGREGATES_PATH = DATA_PATH / "species_aggregates.bin"
 
 # ─── Load AppSKey Registry ─────────────────────────────────────────
 try:
@@ -54,18 +79,64 @@ except Exception as e:
 logger = Logger(base_dir=LOG_PATH)
 SEEN = deque(maxlen=100)
 
+# ─── Init Time-Series Store ────────────────────────────────────────
+timeseries = TimeSeriesStore(TIMESERIES_DB_PATH)
+atexit.register(timeseries.close)
+
+event_store = EventStore(EVENT_DB_PATH) if EVENT_STORE_ENABLED else None
+if event_store:
+    atexit.register(event_store.close)
+
+species = SpeciesAggregator(SPECIES_AGGREGATES_PATH)
+atexit.register(species.close)
+
+# ─── Init Latest-State Table ───────────────────────────────────────
+node_states = NodeStateTable()
+event_bus = EventBus()
+
 
 # ─── Subsystem Routing Hooks ───────────────────────────────────────
 def handle_web_ingestor(event: dict):
+    species.add_event(event, event.get("count", 1))
     ingest_avis_event(event)
 
 
 def handle_weather(event: dict):
-    print("[dispatcher] [weather] Event:", event)
+    timeseries.add_event(event)
 
 
 def handle_telemetry(event: dict):
-    print("[dispatcher] [telemetry] Event:", event)
+    timeseries.add_event(event)
+
+
+# ─── Per-Event Handling ────────────────────────────────────────────
+def handle_event(event: LoRaEvent, data: dict):
+    logger.write_event(data)
+    if event_store:
+        event_store.add_event(data)
+    node_states.update(event, data)
+    event_bus.publish(data)
+
+    # ─ Print Decoded Event
+    print("\n--- DECODED EVENT ---")
+    for k, v in data.items():
+        print(f"{k}: {v}")
+
+    # ─ Dispatch Based on Target
+    target = data.get("target")
+    if target == "web_ingestor":
+        print("[dispatcher] → Routed to: web_ingestor subsystem")
+        handle_web_ingestor(data)
+    elif target == "weather":
+        print("[dispatcher] → Routed to: weather subsystem")
+        handle_weather(data)
+    elif target == "telemetry":
+        print("[dispatcher] → Routed to: telemetry subsystem")
+        handle_telemetry(data)
+    elif target == "protocol":
+        print("[dispatcher] → Protocol housekeeping (species dictionary check)")
+    else:
+        print(f"[dispatcher] Unknown target: {target}")
 
 
 # ─── LoRaWAN Packet Handler ────────────────────────────────────────
@@ -79,26 +150,8 @@ def handle_push_data(payload, addr):
                 continue
             SEEN.append(event.signature)
 
-            data = event.to_dict()
-            logger.write_event(data)
-
-            # ─ Print Decoded Event
-            print("\n--- DECODED EVENT ---")
-            for k, v in data.items():
-                print(f"{k}: {v}")
-
-            # ─ Dispatch Based on Target
-            if event.target == "web_ingestor":
-                print("[dispatcher] → Routed to: web_ingestor subsystem")
-                handle_web_ingestor(data)
-            elif event.target == "weather":
-                print("[dispatcher] → Routed to: weather subsystem")
-                handle_weather(data)
-            elif event.target == "telemetry":
-                print("[dispatcher] → Routed to: telemetry subsystem")
-                handle_telemetry(data)
-            else:
-                print(f"[dispatcher] Unknown target: {event.target}")
+            for data in event.to_dicts():
+                handle_event(event, data)
 
         except Exception as e:
             print(f"[dispatcher] Failed to process rxpk: {e}")
@@ -106,5 +159,7 @@ def handle_push_data(payload, addr):
 
 # ─── Main Entry Point ──────────────────────────────────────────────
 if __name__ == "__main__":
+    start_state_api(node_states, bus=event_bus)
+    start_unix_stream(event_bus)
     listener = UDPListener(handle_push_data_callback=handle_push_data)
     listener.listen_loop()
@@ -0,0 +1,95 @@
+"""
+event_bus.py
+------------
+
+In-process publish/subscribe bus for decoded EnviroPulse events.
+
+Responsibilities:
+- publish(event) serializes the event once and hands the bytes to every
+  subscriber without ever blocking the caller (the UDP ingest loop)
+- Each Subscription owns a bounded buffer; when a slow consumer lets it
+  fill up, the oldest queued event is dropped and counted
+- Consumers (SSE clients, Unix socket clients) block on their own
+  Subscription.get() in their own thread
+
+Usage:
+    from event_bus import EventBus
+    bus = EventBus()
+    sub = bus.subscribe(maxlen=256)
+    bus.publish(event_dict)
+    data = sub.get(timeout=15)     # JSON bytes, or None on timeout/close
+    bus.unsubscribe(sub)
+"""
+
+import json
+import threading
+from collections import deque
+
+
+class Subscription:
+    def __init__(self, name: str, maxlen: int):
+        self.name = name
+        self.dropped = 0
+        self.delivered = 0
+        self._buffer = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def push(self, data: bytes):
+        with self._cond:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1          # deque drops the oldest entry
+            self._buffer.append(data)
+            self._cond.notify()
+
+    def get(self, timeout: float = None):
+        """Returns the next event as JSON bytes, or None on timeout or close."""
+        with self._cond:
+            if not self._buffer and not self._closed:
+                self._cond.wait(timeout)
+            if not self._buffer:
+                return None
+            self.delivered += 1
+            return self._buffer.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = ()
+
+    def subscribe(self, name: str = "subscriber", maxlen: int = 256) -> Subscription:
+        sub = Subscription(name, maxlen)
+        with self._lock:
+            self._subscribers = self._subscribers + (sub,)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        sub.close()
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not sub)
+        if sub.dropped:
+            print(f"[event_bus] {sub.name} unsubscribed, dropped {sub.dropped} events")
+
+    def publish(self, event: dict):
+        subscribers = self._subscribers    # immutable snapshot, no lock needed
+        if not subscribers:
+            return
+        data = json.dumps(event, separators=(",", ":")).encode("utf-8")
+        for sub in subscribers:
+            sub.push(data)
+
+    def stats(self) -> list:
+        return [
+            {"name": s.name, "queued": len(s._buffer), "delivered": s.delivered, "dropped": s.dropped}
+            for s in self._subscribers
+        ]
@@ -0,0 +1,199 @@
+"""
+event_store.py
+--------------
+
+Optional queryable SQLite sink for decoded EnviroPulse events.
+
+Schema (normalized):
+- nodes    (node_id, devaddr, first_seen, last_seen)
+- species  (taxonomy, common_name)        ← keyed by taxonomy_map.json code,
+                                            pre-populated from the map
+- events   (id, node_id, time, event_type, taxonomy, confidence, fcnt, fields)
+
+Indexes:
+- idx_events_node_time      (node_id, time, event_type, taxonomy, confidence)
+- idx_events_taxonomy_time  (taxonomy, time, node_id, confidence)
+                             partial: detections only
+Both carry every column the typical "what/where/when" queries select, so those
+queries are answered from the index alone. DevAddr is normalized to node_id
+so the (devaddr, time) index stores a small integer instead of the hex string.
+
+Writes go through SQLiteStore group commits (N events or T ms per WAL
+transaction), which keeps write amplification on the gateway's SD card low.
+
+Usage:
+    from event_store import EventStore
+    store = EventStore("EP/data/events.db")
+    store.add_event(event_dict)                # as produced by LoRaEvent.to_dict()
+    rows = store.node_events("26011B01", start, end)
+    store.close()
+"""
+
+import json
+
+from protocol import Protocol
+from sqlite_store import SQLiteStore
+from timeseries_store import event_epoch
+
+
+# Columns that are normalized out of the per-event `fields` JSON
+_NORMALIZED = {
+    "devaddr", "fcnt", "event_type", "timestamp", "event_timestamp",
+    "common_name", "confidence_label", "target",
+    "encrypted_frm", "mic", "decrypted_hex", "raw_signature", "received_at", "fport",
+}
+
+
+class EventStore(SQLiteStore):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS nodes (
+            node_id    INTEGER PRIMARY KEY,
+            devaddr    TEXT    NOT NULL UNIQUE,
+            first_seen INTEGER NOT NULL,
+            last_seen  INTEGER NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS species (
+            taxonomy    INTEGER PRIMARY KEY,
+            common_name TEXT    NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS events (
+            id         INTEGER PRIMARY KEY,
+            node_id    INTEGER NOT NULL REFERENCES nodes (node_id),
+            time       INTEGER NOT NULL,
+            event_type INTEGER NOT NULL,
+            taxonomy   INTEGER REFERENCES species (taxonomy),
+            confidence INTEGER,
+            fcnt       INTEGER,
+            fields     TEXT
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_events_node_time
+            ON events (node_id, time, event_type, taxonomy, confidence);
+
+        CREATE INDEX IF NOT EXISTS idx_events_taxonomy_time
+            ON events (taxonomy, time, node_id, confidence)
+            WHERE taxonomy IS NOT NULL;
+    """
+
+    def __init__(self, db_path, batch_size: int = 100, flush_interval_ms: int = 5000):
+        self._proto = Protocol()
+        self._pending = []
+        self._node_ids = {}
+        super().__init__(db_path, batch_size, flush_interval_ms)
+        self._load_species()
+        self._load_nodes()
+
+    def _load_species(self):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO species (taxonomy, common_name) VALUES (?, ?)",
+                [(code, name) for name, code in self._proto._taxonomy_map.items()]
+            )
+
+    def _load_nodes(self):
+        for row in self.query("SELECT node_id, devaddr FROM nodes"):
+            self._node_ids[row["devaddr"]] = row["node_id"]
+
+    # ─── Ingest ────────────────────────────────────────────────────
+    def add_event(self, event: dict):
+        event_type = event.get("event_type", "Unknown")
+        if event_type == "decode_error":
+            return
+
+        is_detection = "common_name" in event
+        extra = {k: v for k, v in event.items() if k not in _NORMALIZED}
+
+        row = (
+            event.get("devaddr", "UNKNOWN"),
+            event_epoch(event),
+            self._proto.event_type_id(event_type),
+            self._proto.taxonomy_code(event["common_name"]) if is_detection else None,
+            self._proto.confidence_bin(event.get("confidence_label")) if is_detection else None,
+            event.get("fcnt"),
+            json.dumps(extra, separators=(",", ":")) if extra else None,
+        )
+        with self._lock:
+            self._pending.append(row)
+            self._note_pending()
+
+    def _pending_count(self) -> int:
+        return len(self._pending)
+
+    def _node_id(self, cur, devaddr: str, ts: int) -> int:
+        node_id = self._node_ids.get(devaddr)
+        if node_id is None:
+            cur.execute(
+                "INSERT INTO nodes (devaddr, first_seen, last_seen) VALUES (?, ?, ?)",
+                (devaddr, ts, ts)
+            )
+            node_id = self._node_ids[devaddr] = cur.lastrowid
+        return node_id
+
+    def _write_batch(self, cur):
+        pending, self._pending = self._pending, []
+
+        last_seen = {}
+        rows = []
+        for devaddr, ts, *rest in pending:
+            node_id = self._node_id(cur, devaddr, ts)
+            last_seen[node_id] = max(ts, last_seen.get(node_id, ts))
+            rows.append((node_id, ts, *rest))
+
+        cur.executemany(
+            """
+            INSERT INTO events (node_id, time, event_type, taxonomy, confidence, fcnt, fields)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows
+        )
+        cur.executemany(
+            "UPDATE nodes SET last_seen = max(last_seen, ?) WHERE node_id = ?",
+            [(ts, node_id) for node_id, ts in last_seen.items()]
+        )
+
+    # ─── Queries ───────────────────────────────────────────────────
+    def node_events(self, devaddr: str, start: int, end: int) -> list:
+        """Index-only: [{time, event_type, taxonomy, confidence}, ...] for one node."""
+        node_id = self._node_ids.get(devaddr)
+        if node_id is None:
+            return []
+        return self.query(
+            """
+            SELECT time, event_type, taxonomy, confidence
+              FROM events
+             WHERE node_id = ? AND time >= ? AND time < ?
+             ORDER BY time
+            """,
+            (node_id, start, end)
+        )
+
+    def species_events(self, common_name: str, start: int, end: int) -> list:
+        """Index-only: [{time, node_id, confidence}, ...] for one species."""
+        return self.query(
+            """
+            SELECT time, node_id, confidence
+              FROM events
+             WHERE taxonomy = ? AND time >= ? AND time < ?
+             ORDER BY time
+            """,
+            (self._proto.taxonomy_code(common_name), start, end)
+        )
+
+    def species_counts(self, start: int, end: int, devaddr: str = None) -> list:
+        """[{common_name, detections}, ...] in the range, optionally for one node."""
+        sql = """
+            SELECT s.common_name, e.detections
+              FROM (SELECT taxonomy,
+                           sum(coalesce(json_extract(fields, '$.count'), 1)) AS detections
+                      FROM events
+                     WHERE taxonomy IS NOT NULL AND time >= ? AND time < ? {node}
+                     GROUP BY taxonomy) AS e
+              JOIN species AS s USING (taxonomy)
+             ORDER BY e.detections DESC
+        """
+        if devaddr is None:
+            return self.query(sql.format(node=""), (start, end))
+        return self.query(sql.format(node="AND node_id = ?"),
+                          (start, end, self._node_ids.get(devaddr, -1)))
@@ -0,0 +1,106 @@
+"""
+event_stream.py
+---------------
+
+Live event stream for downstream consumers over a Unix domain socket.
+
+Each connected client gets its own EventBus subscription and writer
+thread, and receives one JSON event per line (newline-delimited JSON).
+Sends use a timeout so a stalled client only ever blocks its own thread;
+meanwhile its bounded buffer drops the oldest events, and ingest is
+unaffected.
+
+The Server-Sent Events endpoint lives in state_api.py (GET /events) and
+uses the same bus.
+
+Access:
+- The default socket lives in a private directory: systemd's
+  $RUNTIME_DIRECTORY if set, else /tmp/enviropulse-<uid> (created 0700,
+  refused if another user owns it)
+- The socket is chmod 0600 right after bind, so only the server's user can
+  connect; the 0700 directory covers the moment in between
+- A leftover path is only unlinked if it is a socket owned by this user;
+  anything else is refused rather than removed
+
+Usage:
+    from event_stream import start_unix_stream
+    start_unix_stream(bus)              # SOCKET_PATH
+
+    # consumer side (same user):
+    #   socat - UNIX-CONNECT:/tmp/enviropulse-$(id -u)/events.sock
+"""
+
+import os
+import socket
+import stat
+import threading
+
+
+SOCKET_DIR = os.environ.get("RUNTIME_DIRECTORY") or f"/tmp/enviropulse-{os.getuid()}"
+SOCKET_PATH = os.path.join(SOCKET_DIR, "events.sock")
+CLIENT_BUFFER = 256
+SEND_TIMEOUT_SEC = 5.0
+
+
+def _serve_client(bus, conn: socket.socket, name: str):
+    sub = bus.subscribe(name=name, maxlen=CLIENT_BUFFER)
+    conn.settimeout(SEND_TIMEOUT_SEC)
+    try:
+        while not sub.closed:
+            data = sub.get(timeout=15)
+            if data is None:
+                continue
+            conn.sendall(data + b"\n")
+    except OSError:
+        pass  # client went away or stalled past the send timeout
+    finally:
+        bus.unsubscribe(sub)
+        conn.close()
+
+
+def _private_dir(path: str):
+    """Creates path as a 0700 directory, or checks that an existing one is ours."""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a directory owned by uid {os.getuid()}")
+    if st.st_mode & 0o077:
+        os.chmod(path, 0o700)
+
+
+def _remove_stale(path: str):
+    """Unlinks a previous run's socket; refuses anything this user does not own."""
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f"Refusing to replace {path}: not a socket owned by uid {os.getuid()}")
+    os.unlink(path)
+
+
+def start_unix_stream(bus, path: str = SOCKET_PATH):
+    if path == SOCKET_PATH:
+        _private_dir(SOCKET_DIR)
+    _remove_stale(path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)       # not os.umask(): that is process-wide and other threads create files
+    server.listen(8)
+
+    def accept_loop():
+        count = 0
+        while True:
+            conn, _ = server.accept()
+            count += 1
+            threading.Thread(
+                target=_serve_client, args=(bus, conn, f"unix-{count}"), daemon=True
+            ).start()
+
+    threading.Thread(target=accept_loop, daemon=True).start()
+    print(f"[event_stream] Streaming events on unix:{path}")
+    return server
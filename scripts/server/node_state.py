@@ -0,0 +1,116 @@
+"""
+node_state.py
+-------------
+
+In-memory latest-state table for every DevAddr heard by the gateway, so
+"current conditions" views never scan the daily JSON logs.
+
+Per node (NodeState, __slots__):
+- last avis/weather/telemetry event (decoded dicts)
+- last_seen (UTC ISO string), fcnt
+- link quality of the last uplink: rssi, lsnr, datr, freq
+
+NodeStateTable:
+- update(lora_event, data)    ← called by the dispatcher per decoded event
+- snapshot() / node(devaddr)  ← JSON bytes + ETag, re-serialized only when
+                                the state has changed since the last read;
+                                ETags carry a per-process boot token, since
+                                version counters restart at 0 with the server
+
+Usage:
+    from node_state import NodeStateTable
+    table = NodeStateTable()
+    table.update(event, event.to_dict())
+    body, etag = table.snapshot()
+"""
+
+import json
+import secrets
+import threading
+
+
+class NodeState:
+    __slots__ = (
+        "devaddr", "last_seen", "fcnt",
+        "rssi", "lsnr", "datr", "freq",
+        "avis_event", "weather_event", "telemetry_event",
+        "version",
+    )
+
+    EVENT_SLOTS = ("avis_event", "weather_event", "telemetry_event")
+
+    def __init__(self, devaddr: str):
+        self.devaddr = devaddr
+        self.last_seen = None
+        self.fcnt = None
+        self.rssi = None
+        self.lsnr = None
+        self.datr = None
+        self.freq = None
+        self.avis_event = None
+        self.weather_event = None
+        self.telemetry_event = None
+        self.version = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "devaddr": self.devaddr,
+            "last_seen": self.last_seen,
+            "fcnt": self.fcnt,
+            "link": {"rssi": self.rssi, "lsnr": self.lsnr, "datr": self.datr, "freq": self.freq},
+            "last": {name: getattr(self, name) for name in self.EVENT_SLOTS},
+        }
+
+
+class NodeStateTable:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes = {}
+        self._version = 0
+        self._cache = {}           # key → (version, body, etag)
+        self._boot = secrets.token_hex(4)
+
+    def update(self, lora_event, data: dict):
+        with self._lock:
+            state = self._nodes.get(lora_event.devaddr)
+            if state is None:
+                state = self._nodes[lora_event.devaddr] = NodeState(lora_event.devaddr)
+
+            state.last_seen = data.get("received_at")
+            state.fcnt = lora_event.fcnt
+            state.rssi = lora_event.rssi
+            state.lsnr = lora_event.lsnr
+            state.datr = lora_event.datr
+            state.freq = lora_event.freq
+
+            event_type = data.get("event_type")
+            if event_type in NodeState.EVENT_SLOTS:
+                setattr(state, event_type, data)
+
+            self._version += 1
+            state.version = self._version
+
+    def _render(self, key: str, version: int, build) -> tuple:
+        cached = self._cache.get(key)
+        if cached and cached[0] == version:
+            return cached[1], cached[2]
+        body = json.dumps(build(), separators=(",", ":")).encode("utf-8")
+        etag = f'"{self._boot}-{key}-{version}"'
+        self._cache[key] = (version, body, etag)
+        return body, etag
+
+    def snapshot(self) -> tuple:
+        """Returns (json_bytes, etag) for all nodes."""
+        with self._lock:
+            return self._render(
+                "all", self._version,
+                lambda: {addr: s.to_dict() for addr, s in sorted(self._nodes.items())}
+            )
+
+    def node(self, devaddr: str):
+        """Returns (json_bytes, etag) for one node, or None if never heard."""
+        with self._lock:
+            state = self._nodes.get(devaddr.upper())
+            if state is None:
+                return None
+            return self._render(state.devaddr, state.version, state.to_dict)
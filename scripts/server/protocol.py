@@ -5,16 +5,92 @@ protocol.py
 Handles binary encoding and decoding of EnviroPulse events using
 structure_protocol.json, event_type_map.json, and taxonomy_map.json.
 
+Multi-event frames:
+- decode_frame() accepts any FRMPayload: a single event decodes to a
+  one-element list, an event_frame ([id, count] + events back to back)
+  is split using each member's schema length
+- compact_frame payloads (varint time offsets, zigzag-varint deltas with
+  periodic keyframes) are decoded against per-source delta state; a delta
+  whose reference sample was lost yields a decode_error for that event
+  only, until the next keyframe of that type arrives
+
+Bit-packed events:
+- Event types with a "packed" layout in structure_protocol.json may arrive
+  bit-packed; their leading 2 bits are the event type id (1–3), so the
+  first byte is >= 0x40 while byte-aligned events and frame markers are
+  below 0x40
+- One payload may carry several packed events back to back, and
+  event_frame members may be packed; lengths come from the layouts
+- Layouts are compiled once into (shift, width, signed) tuples, so decode
+  is a single int.from_bytes plus shifts and masks
+
+Regional species dictionary:
+- Nodes with a species dictionary send their most frequent species as
+  avis_dict_event (1-byte dictionary code instead of the uint16 taxonomy)
+  on FPort DICT_FPORT_BASE + version; species outside the dictionary still
+  arrive as avis_event, so the full taxonomy code remains the escape path
+- Every dictionary version ever built stays in species_dictionaries/ so
+  older nodes keep decoding; each file's fingerprint is checked on load
+- dictionary_announce events (version + fingerprint, sent by the node)
+  are compared with the local copy; dictionary-coded events from a node
+  whose fingerprint disagrees decode to decode_error instead of a wrong
+  species
+- Dictionary-coded detections are returned as ordinary avis_event dicts
+  (plus "species_dictionary": version), so downstream code is unchanged
+
+Wire-only event types:
+- Schema entries with "decodes_as" (avis_dict_event, avis_summary_event)
+  are returned under that event_type; their extra fields (e.g. "count" of
+  an aggregated detection window) are kept
+
 Guarantees crash-proof operation:
 - Invalid events will raise informative errors or return fallback
 - Unknown taxonomy or type values are replaced with "Unknown"/0
 """
 
+import hashlib
 import struct
 import json
 from pathlib import Path
 
 
+KEYFRAME_FLAG = 0x80
+PACKED_TYPE_BITS = 2
+PACKED_MIN_BYTE = 0x40
+DICT_FPORT_BASE = 64
+DICT_MAX_VERSION = 63
+DICT_ESCAPE_CODE = 0xFF    # never assigned; such species are sent as avis_event
+
+
+def dictionary_fingerprint(version: int, species: list) -> int:
+    """32-bit fingerprint of a species dictionary (same function on the node)."""
+    canonical = json.dumps([version, species], separators=(",", ":"))
+    return int.from_bytes(hashlib.sha256(canonical.encode("utf-8")).digest()[:4], "big")
+
+
+def dictionary_version(fport: int):
+    """Species dictionary version carried by an uplink's FPort (None if not dictionary-coded)."""
+    if DICT_FPORT_BASE < fport <= DICT_FPORT_BASE + DICT_MAX_VERSION:
+        return fport - DICT_FPORT_BASE
+    return None
+
+
+def _unzigzag(n: int) -> int:
+    return (n >> 1) ^ -(n & 1)
+
+
+def _read_varint(data: bytes, offset: int):
+    """Returns (value, new_offset)."""
+    result = shift = 0
+    while True:
+        b = data[offset]
+        offset += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, offset
+        shift += 7
+
+
 class Protocol:
     def __init__(self):
         base = Path(__file__).resolve().parent  # <— SAFELY resolves absolute path
@@ -26,6 +102,10 @@ class Protocol:
         self._reverse_event_map = {v: k for k, v in self._event_map.items()}
         self._reverse_taxonomy_map = {v: k for k, v in self._taxonomy_map.items()}
         self._reverse_confidence_map = {v: k for k, v in self._confidence_map.items()}
+        self._compact_state = {}   # (source, event_type) → (seq, values)
+        self._packed = self._compile_packed()
+        self._dictionaries = self._load_dictionaries(base / "species_dictionaries")
+        self._announced = {}       # source → (version, fingerprint)
 
     def _load_json(self, path: Path) -> dict:
         try:
@@ -35,6 +115,74 @@ class Protocol:
             print(f"[ERROR] Failed to load {path.name}: {e}")
             return {}
 
+    def _compile_packed(self) -> dict:
+        """
+        Returns {type_id: (event_type_str, length_bytes, [(field, shift, width, signed), ...])}
+        for every event type with a "packed" layout.
+        """
+        layouts = {}
+        for event_type_str, struct_def in self._structure.items():
+            packed = struct_def.get("packed")
+            if not packed:
+                continue
+            length = packed["length_bytes"]
+            shift = length * 8
+            fields = []
+            for field in packed["fields"]:
+                shift -= field["bits"]
+                fields.append((field, shift, field["bits"], field.get("signed", False)))
+            if shift < 0 or fields[0][0]["name"] != "event_type" or fields[0][2] != PACKED_TYPE_BITS:
+                print(f"[ERROR] Invalid packed layout for {event_type_str}")
+                continue
+            layouts[self._event_map.get(event_type_str, 0)] = (event_type_str, length, fields)
+        return layouts
+
+    def _load_dictionaries(self, directory: Path) -> dict:
+        """Returns {version: species list} for every valid dictionary file."""
+        dictionaries = {}
+        for path in sorted(directory.glob("species_v*.json")):
+            d = self._load_json(path)
+            try:
+                version, species = d["version"], d["species"]
+                if dictionary_fingerprint(version, species) != d["fingerprint"]:
+                    raise ValueError("fingerprint does not match contents")
+                dictionaries[version] = (d["fingerprint"], species)
+            except Exception as e:
+                print(f"[ERROR] Ignoring species dictionary {path.name}: {e}")
+        return dictionaries
+
+    def _dictionary_species(self, version, source) -> list:
+        if version is None:
+            raise ValueError("Dictionary-coded event outside a dictionary FPort")
+        if version not in self._dictionaries:
+            raise ValueError(f"Unknown species dictionary version {version}")
+        fingerprint, species = self._dictionaries[version]
+        announced = self._announced.get(source)
+        if announced and announced[0] == version and announced[1] != fingerprint:
+            raise ValueError(f"Species dictionary v{version} fingerprint mismatch for {source}")
+        return species
+
+    def _note_announce(self, source, event: dict):
+        version, fingerprint = event.get("version"), event.get("fingerprint")
+        self._announced[source] = (version, fingerprint)
+        local = self._dictionaries.get(version)
+        event["dictionary_match"] = bool(local) and local[0] == fingerprint
+        if not event["dictionary_match"]:
+            print(f"[ERROR] {source} uses species dictionary v{version} "
+                  f"({fingerprint:08x}), which does not match any local copy")
+
+    def taxonomy_code(self, common_name: str) -> int:
+        """Returns the uint16 taxonomy code for a species name (0 if unknown)."""
+        return self._taxonomy_map.get(common_name, 0)
+
+    def confidence_bin(self, label: str) -> int:
+        """Returns the 3-bit confidence bin for a decoded confidence label (0 if unknown)."""
+        return self._confidence_map.get(label, 0)
+
+    def event_type_id(self, event_type: str) -> int:
+        """Returns the numeric event type ID (0 if unknown)."""
+        return self._event_map.get(event_type, 0)
+
     def encode(self, event: dict) -> bytes:
         try:
             event_type_str = event.get("event_type", "Unknown")
@@ -65,12 +213,160 @@ class Protocol:
             print(f"[ERROR] Failed to encode event: {e}")
             return b''
 
-    def decode(self, data: bytes) -> dict:
+    def event_length(self, first_byte: int) -> int:
+        """Encoded length of a single event starting with this byte (0 if unknown)."""
+        if first_byte >= PACKED_MIN_BYTE:
+            layout = self._packed.get(first_byte >> (8 - PACKED_TYPE_BITS))
+            return layout[1] if layout else 0
+        if first_byte in (self._event_map.get("event_frame"), self._event_map.get("compact_frame")):
+            return 0
+        struct_def = self._structure.get(self._reverse_event_map.get(first_byte, "Unknown"))
+        return struct.calcsize(struct_def["format"]) if struct_def else 0
+
+    def _split_events(self, data: bytes, offset: int, count: int = None, **ctx) -> list:
+        """Decodes back-to-back single events from offset (all of them if count is None)."""
+        events = []
+        while (offset < len(data)) if count is None else (len(events) < count):
+            length = self.event_length(data[offset]) if offset < len(data) else 0
+            if not length or offset + length > len(data):
+                print(f"[ERROR] Truncated multi-event payload after {len(events)} events")
+                events.append({
+                    "event_type": "decode_error",
+                    "raw": data[offset:].hex(),
+                    "error": f"truncated multi-event payload after {len(events)} events"
+                })
+                break
+            events.append(self.decode(data[offset:offset + length], **ctx))
+            offset += length
+        return events
+
+    def decode_frame(self, data: bytes, source: str = None, dictionary_version: int = None) -> list:
+        """
+        Decodes a single event, an event_frame or a compact_frame into a list of
+        event dicts. `source` (the DevAddr) keys the compact delta state and
+        the announced species dictionary; `dictionary_version` comes from the
+        uplink's FPort (see dictionary_version()).
+        """
+        ctx = {"source": source, "dictionary_version": dictionary_version}
+        if data and data[0] == self._event_map.get("compact_frame"):
+            return self.decode_compact(data, **ctx)
+
+        if data and data[0] >= PACKED_MIN_BYTE:
+            return self._split_events(data, 0, **ctx)
+
+        if len(data) < 2 or data[0] != self._event_map.get("event_frame"):
+            return [self.decode(data, **ctx)]
+
+        offset = struct.calcsize(self._structure["event_frame"]["format"])
+        return self._split_events(data, offset, count=data[1], **ctx)
+
+    def decode_compact(self, data: bytes, source: str = None, dictionary_version: int = None) -> list:
+        frame_def = self._structure["compact_frame"]
+        delta_types = set(frame_def.get("delta_types", []))
+        events = []
+        try:
+            _, base_time, count = struct.unpack_from(frame_def["format"], data, 0)
+            offset = struct.calcsize(frame_def["format"])
+
+            for _ in range(count):
+                tag = data[offset]
+                offset += 1
+                keyframe = bool(tag & KEYFRAME_FLAG)
+                event_type_str = self._reverse_event_map.get(tag & ~KEYFRAME_FLAG, "Unknown")
+                struct_def = self._structure.get(event_type_str)
+                if not struct_def:
+                    raise ValueError(f"Unknown event_type ID in compact frame: {tag & ~KEYFRAME_FLAG}")
+
+                time_offset, offset = _read_varint(data, offset)
+                delta_coded = event_type_str in delta_types
+                if delta_coded:
+                    seq = data[offset]
+                    offset += 1
+
+                fields = []
+                for _ in struct_def["fields"][2:]:
+                    raw, offset = _read_varint(data, offset)
+                    fields.append(_unzigzag(raw))
+
+                if delta_coded and not keyframe:
+                    key = (source, event_type_str)
+                    prev = self._compact_state.get(key)
+                    if prev is None or seq != (prev[0] + 1) & 0xFF:
+                        self._compact_state.pop(key, None)
+                        events.append({
+                            "event_type": "decode_error",
+                            "timestamp": base_time + time_offset,
+                            "error": f"{event_type_str} delta reference lost (seq {seq}); waiting for keyframe"
+                        })
+                        continue
+                    fields = [p + d for p, d in zip(prev[1], fields)]
+
+                if delta_coded:
+                    self._compact_state[(source, event_type_str)] = (seq, fields)
+
+                values = [tag & ~KEYFRAME_FLAG, base_time + time_offset, *fields]
+                try:
+                    events.append(self._event_from_values(
+                        event_type_str, struct_def, values, source, dictionary_version
+                    ))
+                except ValueError as e:
+                    events.append({"event_type": "decode_error", "timestamp": values[1], "error": str(e)})
+
+        except Exception as e:
+            print(f"[ERROR] Failed to decode compact frame: {e}")
+            events.append({"event_type": "decode_error", "raw": data.hex(), "error": str(e)})
+
+        return events
+
+    def _event_from_values(self, event_type_str: str, struct_def: dict, values,
+                           source: str = None, dictionary_version: int = None) -> dict:
+        event = {"event_type": struct_def.get("decodes_as", event_type_str)}
+        for i, field in enumerate(struct_def["fields"]):
+            name = field["name"]
+            if name == "event_type":
+                continue
+            elif "map" in field and name == "taxonomy":
+                event["common_name"] = self._reverse_taxonomy_map.get(values[i], "Unknown")
+            elif "map" in field and name == "species_code":
+                species = self._dictionary_species(dictionary_version, source)
+                event["common_name"] = species[values[i]] if values[i] < len(species) else "Unknown"
+                event["species_dictionary"] = dictionary_version
+            elif "map" in field and name == "confidence":
+                event["confidence_label"] = self._reverse_confidence_map.get(values[i], "Unknown")
+            else:
+                event[name] = values[i]
+        if event_type_str == "dictionary_announce":
+            self._note_announce(source, event)
+        return event
+
+    def _decode_packed(self, data: bytes) -> dict:
+        event_type_str, length, fields = self._packed[data[0] >> (8 - PACKED_TYPE_BITS)]
+        if len(data) != length:
+            raise ValueError(f"Incorrect packed length for {event_type_str}: expected {length}, got {len(data)}")
+        acc = int.from_bytes(data, "big")
+        event = {"event_type": event_type_str}
+        for field, shift, width, signed in fields[1:]:
+            v = (acc >> shift) & ((1 << width) - 1)
+            if signed and v >> (width - 1):
+                v -= 1 << width
+            name = field["name"]
+            if "map" in field and name == "taxonomy":
+                event["common_name"] = self._reverse_taxonomy_map.get(v, "Unknown")
+            elif "map" in field and name == "confidence":
+                event["confidence_label"] = self._reverse_confidence_map.get(v, "Unknown")
+            else:
+                event[name] = v
+        return event
+
+    def decode(self, data: bytes, source: str = None, dictionary_version: int = None) -> dict:
         if len(data) < 1:
             print("[ERROR] Cannot decode empty payload.")
             return {"event_type": "decode_error", "raw": data.hex()}
 
         try:
+            if data[0] >= PACKED_MIN_BYTE:
+                return self._decode_packed(data)
+
             event_type_id = data[0]
             event_type_str = self._reverse_event_map.get(event_type_id, "Unknown")
             struct_def = self._structure.get(event_type_str)
@@ -82,22 +378,9 @@ class Protocol:
             if len(data) != expected_len:
                 raise ValueError(f"Incorrect payload length for {event_type_str}: expected {expected_len}, got {len(data)}")
 
-            fields = struct_def["fields"]
-            unpacked = struct.unpack(fmt, data)
-            event = {"event_type": event_type_str}
-
-            for i, field in enumerate(fields):
-                name = field["name"]
-                if name == "event_type":
-                    continue
-                elif "map" in field and name == "taxonomy":
-                    event["common_name"] = self._reverse_taxonomy_map.get(unpacked[i], "Unknown")
-                elif "map" in field and name == "confidence":
-                    event["confidence_label"] = self._reverse_confidence_map.get(unpacked[i], "Unknown")
-                else:
-                    event[name] = unpacked[i]
-
-            return event
+            return self._event_from_values(
+                event_type_str, struct_def, struct.unpack(fmt, data), source, dictionary_version
+            )
 
         except Exception as e:
             print(f"[ERROR] Failed to decode payload: {e}")
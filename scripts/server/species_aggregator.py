@@ -0,0 +1,223 @@
+"""
+species_aggregator.py
+---------------------
+
+Incrementally maintained species occurrence aggregates, fed by decoded
+avis_events, so per-species questions never re-scan the daily JSON logs.
+
+Per (DevAddr, hour) the aggregator keeps an array-backed block:
+- codes:  array('H')          ← sorted taxonomy codes heard in that hour
+- bins:   array('H', 8 × n)   ← confidence-bin histogram (bins 0–7) per code
+The detection count for a species is the sum of its 8 bins.
+
+Blocks are indexed by hour (a sorted hour list plus hour → {devaddr: block}),
+so a range query visits only the hours it asks for. Queries copy what they
+need under the lock and aggregate after releasing it.
+
+Persistence:
+- Compact binary snapshot (EP/data/species_aggregates.bin), rewritten
+  atomically (temp file + os.replace) at most every `save_interval` seconds
+  and on close()
+- Blocks older than `retention_days` (counted back from now) are pruned
+  on save; events stamped more than MAX_FUTURE_SEC ahead of the server
+  clock are ignored, so a node with a skewed clock cannot create blocks
+
+Usage:
+    from species_aggregator import SpeciesAggregator
+    agg = SpeciesAggregator("EP/data/species_aggregates.bin")
+    agg.add_event(event_dict)
+    agg.hourly_counts("26011B01", "Acorn Woodpecker", start, end)
+    agg.histogram(None, "Acorn Woodpecker", start, end)   # all nodes
+    agg.close()
+"""
+
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from pathlib import Path
+
+from protocol import Protocol
+from timeseries_store import event_epoch
+
+
+NUM_BINS = 8
+MAX_BIN_COUNT = 0xFFFF
+MAX_FUTURE_SEC = 24 * 3600
+
+_MAGIC = b"EPSA"
+_FILE_HEADER = struct.Struct(">4sBI")      # magic, version, block count
+_BLOCK_HEADER = struct.Struct(">IIH")      # devaddr, hour index, species count
+
+
+class SpeciesAggregator:
+    def __init__(self, path, save_interval: float = 60.0, retention_days: int = 400):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.save_interval = save_interval
+        self.retention_hours = retention_days * 24
+
+        self._proto = Protocol()
+        self._lock = threading.Lock()
+        self._blocks = {}          # hour:int → {devaddr:int → [codes, bins]}
+        self._hours = []           # sorted keys of _blocks
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._load()
+
+    # ─── Ingest ────────────────────────────────────────────────────
+    def add_event(self, event: dict, count: int = 1):
+        if "common_name" not in event:
+            return
+        code = self._proto.taxonomy_code(event["common_name"])
+        conf_bin = self._proto.confidence_bin(event.get("confidence_label"))
+        ts = event_epoch(event)
+        if ts > time.time() + MAX_FUTURE_SEC:
+            print(f"[WARN] species_aggregator: ignoring {event.get('devaddr')} event "
+                  f"stamped {ts - int(time.time())}s in the future")
+            return
+        self.add(event.get("devaddr", "00000000"), ts, code, conf_bin, count)
+
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def add(self, devaddr: str, ts: int, code: int, conf_bin: int, count: int = 1):
+        addr, hour = int(devaddr, 16), ts // 3600
+        with self._lock:
+            nodes = self._blocks.get(hour)
+            if nodes is None:
+                nodes = self._blocks[hour] = {}
+                insort(self._hours, hour)
+            block = nodes.get(addr)
+            if block is None:
+                block = nodes[addr] = [array("H"), array("H")]
+            codes, bins = block
+
+            i = bisect_left(codes, code)
+            if i == len(codes) or codes[i] != code:
+                codes.insert(i, code)
+                bins[i * NUM_BINS:i * NUM_BINS] = array("H", bytes(2 * NUM_BINS))
+
+            slot = i * NUM_BINS + conf_bin
+            bins[slot] = min(bins[slot] + count, MAX_BIN_COUNT)
+            self._dirty = True
+
+    # ─── Queries ───────────────────────────────────────────────────
+    def _range_blocks(self, devaddr, start, end):
+        """Yields (hour, codes, bins) of the blocks in [start, end) (lock held)."""
+        node = int(devaddr, 16) if devaddr else None
+        lo = bisect_left(self._hours, start // 3600)
+        hi = bisect_right(self._hours, (end - 1) // 3600)
+        for hour in self._hours[lo:hi]:
+            nodes = self._blocks[hour]
+            if node is None:
+                for codes, bins in nodes.values():
+                    yield hour, codes, bins
+            elif node in nodes:
+                yield hour, *nodes[node]
+
+    def _species_slices(self, devaddr, common_name, start, end) -> list:
+        """[(hour, bins slice), ...] for one species, copied under the lock."""
+        code = self._proto.taxonomy_code(common_name)
+        slices = []
+        with self._lock:
+            for hour, codes, bins in self._range_blocks(devaddr, start, end):
+                i = bisect_left(codes, code)
+                if i < len(codes) and codes[i] == code:
+                    slices.append((hour, bins[i * NUM_BINS:(i + 1) * NUM_BINS]))
+        return slices
+
+    def hourly_counts(self, devaddr, common_name: str, start: int, end: int) -> list:
+        """[(hour_start_epoch, detections), ...] sorted; devaddr=None sums all nodes."""
+        totals = {}
+        for hour, hist in self._species_slices(devaddr, common_name, start, end):
+            totals[hour] = totals.get(hour, 0) + sum(hist)
+        return [(hour * 3600, n) for hour, n in sorted(totals.items())]
+
+    def histogram(self, devaddr, common_name: str, start: int, end: int) -> list:
+        """Confidence-bin histogram [n0, ..., n7] over the range."""
+        totals = [0] * NUM_BINS
+        for _, hist in self._species_slices(devaddr, common_name, start, end):
+            for b, n in enumerate(hist):
+                totals[b] += n
+        return totals
+
+    def top_species(self, devaddr, start: int, end: int, k: int = 10) -> list:
+        """[(common_name, detections), ...] for the k most detected species."""
+        totals = {}
+        with self._lock:
+            for _, codes, bins in self._range_blocks(devaddr, start, end):
+                for i, code in enumerate(codes):
+                    totals[code] = totals.get(code, 0) + sum(bins[i * NUM_BINS:(i + 1) * NUM_BINS])
+        ranked = sorted(totals.items(), key=lambda kv: (-kv[1], kv[0]))[:k]      # ties by code
+        return [(self._proto._reverse_taxonomy_map.get(code, "Unknown"), n) for code, n in ranked]
+
+    # ─── Persistence ───────────────────────────────────────────────
+    def _load(self):
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return
+
+        try:
+            magic, version, n_blocks = _FILE_HEADER.unpack_from(data, 0)
+            if magic != _MAGIC or version != 1:
+                raise ValueError("unrecognized file header")
+            offset = _FILE_HEADER.size
+            for _ in range(n_blocks):
+                addr, hour, n = _BLOCK_HEADER.unpack_from(data, offset)
+                offset += _BLOCK_HEADER.size
+                codes = array("H", data[offset:offset + 2 * n])
+                offset += 2 * n
+                bins = array("H", data[offset:offset + 2 * n * NUM_BINS])
+                offset += 2 * n * NUM_BINS
+                if sys.byteorder == "little":
+                    codes.byteswap()
+                    bins.byteswap()
+                self._blocks.setdefault(hour, {})[addr] = [codes, bins]
+            self._hours = sorted(self._blocks)
+        except Exception as e:
+            print(f"[species_aggregator] Failed to load {self.path.name}: {e}")
+            self._blocks = {}
+            self._hours = []
+
+    def save(self):
+        with self._lock:
+            self._last_save = time.monotonic()
+            if not self._dirty:
+                return
+
+            if self._hours:
+                cut = bisect_left(self._hours, int(time.time()) // 3600 - self.retention_hours)
+                for hour in self._hours[:cut]:
+                    del self._blocks[hour]
+                del self._hours[:cut]
+
+            blocks = sorted(
+                (addr, hour, codes, bins)
+                for hour, nodes in self._blocks.items()
+                for addr, (codes, bins) in nodes.items()
+            )
+            parts = [_FILE_HEADER.pack(_MAGIC, 1, len(blocks))]
+            for addr, hour, codes, bins in blocks:
+                parts.append(_BLOCK_HEADER.pack(addr, hour, len(codes)))
+                for arr in (codes, bins):
+                    out = array("H", arr)
+                    if sys.byteorder == "little":
+                        out.byteswap()      # file is big-endian like the wire format
+                    parts.append(out.tobytes())
+            self._dirty = False
+
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            tmp.write_bytes(b"".join(parts))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[species_aggregator] Failed to save {self.path.name}: {e}")
+            self._dirty = True
+
+    def close(self):
+        self.save()
@@ -0,0 +1,157 @@
+"""
+species_dictionary.py
+---------------------
+
+Builds the per-deployment "hot species" dictionary from historical
+detections in the daily JSON logs (EP/logs/).
+
+The most frequently detected species get 1-byte codes (0–254, most
+frequent first); code 255 is never assigned and every other species keeps
+travelling as a regular avis_event with its full uint16 taxonomy code.
+A dictionary-coded detection (avis_dict_event) is 7 bytes instead of 8.
+
+Versioning:
+- Each build that changes the species list is written as a new version
+  (1–63) to species_dictionaries/species_v<N>.json; old versions are kept
+  so nodes still running them keep decoding
+- The node sends dictionary-coded uplinks on FPort 64 + version and
+  announces (version, fingerprint) at startup and daily; the server
+  rejects dictionary-coded events whose fingerprint disagrees
+- The fingerprint is a 32-bit SHA-256 prefix over (version, species list),
+  see protocol.dictionary_fingerprint()
+
+Deployment:
+- Copy the printed file to the node as EP/scripts/node/species_dictionary.json
+  and restart the node dispatcher
+
+Usage:
+    python3 species_dictionary.py                 # build next version if changed
+    python3 species_dictionary.py --size 64 --min-count 5
+    python3 species_dictionary.py --dry-run       # report coverage only
+"""
+
+import argparse
+import json
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from protocol import Protocol, DICT_ESCAPE_CODE, DICT_MAX_VERSION, dictionary_fingerprint
+
+
+# ─── Configurable Paths ─────────────────────────────────────────────
+BASE_DIR = Path(__file__).resolve().parent
+LOG_PATH = BASE_DIR.parent.parent / "logs"
+DICTIONARY_DIR = BASE_DIR / "species_dictionaries"
+
+DEFAULT_MIN_COUNT = 2
+AVIS_EVENT_BYTES = 8
+AVIS_DICT_EVENT_BYTES = 7
+
+
+# ─── Building ──────────────────────────────────────────────────────
+def count_species(log_dir: Path = LOG_PATH) -> Counter:
+    """Counts logged avis_event detections per species name."""
+    counts = Counter()
+    for path in sorted(Path(log_dir).glob("*.json")):
+        try:
+            events = json.loads(path.read_text())
+        except Exception as e:
+            print(f"[species_dictionary] Skipping {path.name}: {e}", file=sys.stderr)
+            continue
+        for event in events:
+            if event.get("event_type") == "avis_event":
+                counts[event.get("common_name", "Unknown")] += 1
+    return counts
+
+
+def select_species(counts: Counter, proto: Protocol, size: int, min_count: int) -> list:
+    """Most frequent encodable species first; ties broken by name for stable builds."""
+    ranked = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+    return [
+        name for name, n in ranked
+        if n >= min_count and name != "Unknown" and proto.taxonomy_code(name)
+    ][:size]
+
+
+def latest_dictionary(directory: Path = DICTIONARY_DIR):
+    """Returns the highest-version dictionary dict, or None."""
+    latest = None
+    for path in directory.glob("species_v*.json"):
+        d = json.loads(path.read_text())
+        if latest is None or d["version"] > latest["version"]:
+            latest = d
+    return latest
+
+
+def coverage_report(counts: Counter, species: list) -> dict:
+    total = sum(n for name, n in counts.items() if name != "Unknown")
+    covered = sum(counts[name] for name in species)
+    avg = ((covered * AVIS_DICT_EVENT_BYTES + (total - covered) * AVIS_EVENT_BYTES) / total
+           if total else float(AVIS_EVENT_BYTES))
+    return {
+        "detections": total,
+        "covered": covered,
+        "coverage": round(covered / total, 4) if total else 0.0,
+        "avg_avis_bytes": round(avg, 3),
+    }
+
+
+def build(size: int, min_count: int, log_dir: Path = LOG_PATH,
+          directory: Path = DICTIONARY_DIR, dry_run: bool = False):
+    """Builds and (unless dry_run or unchanged) writes the next dictionary version."""
+    counts = count_species(log_dir)
+    species = select_species(counts, Protocol(), size, min_count)
+    report = coverage_report(counts, species)
+    print(f"[species_dictionary] {len(species)} species cover "
+          f"{report['covered']}/{report['detections']} detections "
+          f"({report['coverage']:.1%}); avg avis_event {report['avg_avis_bytes']} B "
+          f"instead of {AVIS_EVENT_BYTES} B")
+
+    latest = latest_dictionary(directory) if directory.exists() else None
+    if latest and latest["species"] == species:
+        print(f"[species_dictionary] Unchanged from v{latest['version']}")
+        return None
+    if not species:
+        print("[species_dictionary] No species qualify; nothing written")
+        return None
+
+    version = latest["version"] + 1 if latest else 1
+    if version > DICT_MAX_VERSION:
+        raise ValueError(f"Dictionary versions exhausted (max {DICT_MAX_VERSION})")
+
+    dictionary = {
+        "version": version,
+        "fingerprint": dictionary_fingerprint(version, species),
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "escape_code": DICT_ESCAPE_CODE,
+        **report,
+        "species": species,
+    }
+    if dry_run:
+        return dictionary
+
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"species_v{version}.json"
+    path.write_text(json.dumps(dictionary, indent=2))
+    print(f"[species_dictionary] Wrote {path} (fingerprint {dictionary['fingerprint']:08x})")
+    print("[species_dictionary] Copy it to the node as scripts/node/species_dictionary.json")
+    return dictionary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build the regional species dictionary")
+    parser.add_argument("--size", type=int, default=DICT_ESCAPE_CODE,
+                        help=f"number of 1-byte codes (max {DICT_ESCAPE_CODE})")
+    parser.add_argument("--min-count", type=int, default=DEFAULT_MIN_COUNT)
+    parser.add_argument("--logs", type=Path, default=LOG_PATH)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    build(min(args.size, DICT_ESCAPE_CODE), args.min_count, args.logs, dry_run=args.dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
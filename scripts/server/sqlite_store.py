@@ -0,0 +1,111 @@
+"""
+sqlite_store.py
+---------------
+
+Base class for EnviroPulse SQLite sinks that write through group commits.
+
+Responsibilities:
+- Open one long-lived connection in WAL mode (synchronous=NORMAL)
+- Create the subclass schema on first use
+- Buffer writes in memory and commit them in one transaction when either
+  `batch_size` events are pending or `flush_interval_ms` has elapsed
+- Serialize reads and writes on the shared connection with a lock
+
+Subclasses implement:
+- SCHEMA                     ← executescript() DDL, idempotent
+- _write_batch(cur)          ← write everything currently buffered
+- _pending_count()           ← number of buffered events
+
+and call self._note_pending() after buffering an event. The hooks are
+abstract, so a subclass missing one fails at construction.
+
+Write amplification on the SD card stays low because one commit (one WAL
+append + fsync at checkpoint) covers many events.
+
+Usage:
+    class MyStore(SQLiteStore):
+        SCHEMA = "CREATE TABLE IF NOT EXISTS ..."
+        ...
+    store = MyStore("EP/data/my.db", batch_size=50, flush_interval_ms=2000)
+    store.close()   # flushes pending rows
+"""
+
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+
+class SQLiteStore(ABC):
+    SCHEMA = ""
+
+    def __init__(self, db_path, batch_size: int = 50, flush_interval_ms: int = 2000):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+        self._oldest_pending = None
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    # ─── Subclass Hooks ────────────────────────────────────────────
+    @abstractmethod
+    def _write_batch(self, cur: sqlite3.Cursor):
+        ...
+
+    @abstractmethod
+    def _pending_count(self) -> int:
+        ...
+
+    # ─── Group Commit ──────────────────────────────────────────────
+    def _note_pending(self):
+        """Call with self._lock held after buffering one event."""
+        if self._oldest_pending is None:
+            self._oldest_pending = time.monotonic()
+        if self._pending_count() >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Commits all buffered events in a single transaction."""
+        with self._lock:
+            if not self._pending_count():
+                return
+            try:
+                with self._conn:
+                    self._write_batch(self._conn.cursor())
+            except sqlite3.Error as e:
+                print(f"[{self.__class__.__name__}] Batch commit failed: {e}")
+            finally:
+                self._oldest_pending = None
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval / 2):
+            oldest = self._oldest_pending
+            if oldest is not None and time.monotonic() - oldest >= self.flush_interval:
+                self.flush()
+
+    # ─── Reads ─────────────────────────────────────────────────────
+    def query(self, sql: str, params=()) -> list:
+        """Runs a read query on the shared connection (sees committed rows only)."""
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self.flush()
+        with self._lock:
+            self._conn.close()
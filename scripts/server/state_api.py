@@ -0,0 +1,106 @@
+"""
+state_api.py
+------------
+
+Small local HTTP/JSON read API over the gateway's in-memory node state.
+
+Endpoints (GET):
+- /nodes              ← latest state of every node
+- /nodes/<DEVADDR>    ← latest state of one node (404 if never heard)
+- /events             ← live Server-Sent Events stream of decoded events
+                        (only when started with an EventBus)
+
+Responses carry an ETag; a request with a matching If-None-Match gets
+304 Not Modified with no body, so dashboards can poll cheaply. Nothing
+here touches the disk.
+
+Each SSE client holds its own handler thread and EventBus subscription;
+a client that stops reading only loses its own oldest buffered events.
+
+Runs on a daemon thread (ThreadingHTTPServer) next to the UDP listener.
+
+Usage:
+    from state_api import start_state_api
+    server = start_state_api(node_state_table, bus=event_bus)
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+API_HOST = "127.0.0.1"
+API_PORT = 8081
+SSE_BUFFER = 256
+SSE_KEEPALIVE_SEC = 15
+
+
+class StateRequestHandler(BaseHTTPRequestHandler):
+    table = None           # NodeStateTable, set by start_state_api()
+    bus = None             # EventBus, optional
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+
+        if path == "/events" and self.bus is not None:
+            self._stream_events()
+            return
+
+        if path == "/nodes":
+            result = self.table.snapshot()
+        elif path.startswith("/nodes/"):
+            result = self.table.node(path[len("/nodes/"):])
+        else:
+            result = None
+
+        if result is None:
+            self._send(404, b'{"error":"not found"}')
+            return
+
+        body, etag = result
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", etag)
+        else:
+            self._send(200, body, etag)
+
+    def _send(self, status: int, body: bytes, etag: str = None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _stream_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        sub = self.bus.subscribe(name=f"sse-{self.client_address[0]}:{self.client_address[1]}",
+                                 maxlen=SSE_BUFFER)
+        self.connection.settimeout(SSE_KEEPALIVE_SEC)
+        try:
+            while True:
+                data = sub.get(timeout=SSE_KEEPALIVE_SEC)
+                self.wfile.write(b"data: " + data + b"\n\n" if data else b": keepalive\n\n")
+                self.wfile.flush()
+        except OSError:
+            pass  # client disconnected or stalled past the send timeout
+        finally:
+            self.bus.unsubscribe(sub)
+
+    def log_message(self, format, *args):
+        pass  # keep the dispatcher console for decoded events
+
+
+def start_state_api(table, host: str = API_HOST, port: int = API_PORT, bus=None):
+    handler = type("BoundStateRequestHandler", (StateRequestHandler,), {"table": table, "bus": bus})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[state_api] Serving node state on http://{host}:{port}/nodes")
+    return server
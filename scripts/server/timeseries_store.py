@@ -0,0 +1,168 @@
+"""
+timeseries_store.py
+-------------------
+
+SQLite-backed time-series store for weather and telemetry events, with
+continuously maintained per-node rollups.
+
+Responsibilities:
+- Store every weather/telemetry reading as a raw sample (physical units);
+  a repeated (devaddr, metric, ts), e.g. a retransmitted uplink, is ignored
+- Maintain 1-minute, 1-hour and 1-day rollups (min/max/sum/count) per
+  DevAddr and metric from the samples that were actually inserted, so
+  duplicates are never counted twice
+- Coalesce rollup updates in memory so a batch of N events costs one
+  upsert per touched bucket, committed in one WAL transaction
+- Answer range queries from the precomputed rollups
+
+Metrics (scaled from protocol units):
+- weather_event:    temperature (°C), humidity (%), pressure (hPa)
+- telemetry_event:  lat, lon (decimal degrees), alt (m)
+
+Usage:
+    from timeseries_store import TimeSeriesStore
+    store = TimeSeriesStore("EP/data/timeseries.db")
+    store.add_event(event_dict)
+    rows = store.query_range("26011B01", "pressure", start, end, resolution="1h")
+    store.close()
+"""
+
+from datetime import datetime
+
+from sqlite_store import SQLiteStore
+
+
+METRICS = {
+    "weather_event": {"temperature": 1.0, "humidity": 1.0, "pressure": 0.1},
+    "telemetry_event": {"lat": 1e-5, "lon": 1e-5, "alt": 1.0},
+}
+
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+
+def event_epoch(event: dict) -> int:
+    """Node timestamp if present, else the gateway receive time."""
+    if "timestamp" in event:
+        return int(event["timestamp"])
+    return int(datetime.fromisoformat(event["received_at"]).timestamp())
+
+
+class TimeSeriesStore(SQLiteStore):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS samples (
+            devaddr TEXT    NOT NULL,
+            metric  TEXT    NOT NULL,
+            ts      INTEGER NOT NULL,
+            value   REAL    NOT NULL,
+            PRIMARY KEY (devaddr, metric, ts)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS rollups (
+            devaddr    TEXT    NOT NULL,
+            metric     TEXT    NOT NULL,
+            resolution INTEGER NOT NULL,
+            bucket     INTEGER NOT NULL,
+            min        REAL    NOT NULL,
+            max        REAL    NOT NULL,
+            sum        REAL    NOT NULL,
+            count      INTEGER NOT NULL,
+            PRIMARY KEY (devaddr, metric, resolution, bucket)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, db_path, batch_size: int = 50, flush_interval_ms: int = 5000):
+        self._samples = []
+        super().__init__(db_path, batch_size, flush_interval_ms)
+
+    # ─── Ingest ────────────────────────────────────────────────────
+    def add_event(self, event: dict):
+        metrics = METRICS.get(event.get("event_type"))
+        if not metrics:
+            return
+
+        devaddr = event.get("devaddr", "UNKNOWN")
+        ts = event_epoch(event)
+
+        with self._lock:
+            for metric, scale in metrics.items():
+                if metric not in event:
+                    continue
+                self._samples.append((devaddr, metric, ts, event[metric] * scale))
+            self._note_pending()
+
+    def _pending_count(self) -> int:
+        return len(self._samples)
+
+    def _write_batch(self, cur):
+        samples, self._samples = self._samples, []
+
+        rollups = {}
+        for sample in samples:
+            cur.execute(
+                "INSERT OR IGNORE INTO samples (devaddr, metric, ts, value) VALUES (?, ?, ?, ?)",
+                sample
+            )
+            if not cur.rowcount:
+                continue                    # already stored: its rollups are counted
+            devaddr, metric, ts, value = sample
+            for resolution in RESOLUTIONS.values():
+                key = (devaddr, metric, resolution, ts - ts % resolution)
+                agg = rollups.get(key)
+                if agg is None:
+                    rollups[key] = [value, value, value, 1]
+                else:
+                    agg[0] = min(agg[0], value)
+                    agg[1] = max(agg[1], value)
+                    agg[2] += value
+                    agg[3] += 1
+
+        cur.executemany(
+            """
+            INSERT INTO rollups (devaddr, metric, resolution, bucket, min, max, sum, count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (devaddr, metric, resolution, bucket) DO UPDATE SET
+                min   = min(rollups.min, excluded.min),
+                max   = max(rollups.max, excluded.max),
+                sum   = rollups.sum + excluded.sum,
+                count = rollups.count + excluded.count
+            """,
+            [(*key, *agg) for key, agg in rollups.items()]
+        )
+
+    # ─── Queries ───────────────────────────────────────────────────
+    def query_range(self, devaddr: str, metric: str, start: int, end: int,
+                    resolution: str = "auto", max_points: int = 500) -> list:
+        """
+        Returns [{bucket, min, max, mean, count}, ...] for start <= bucket < end.
+        resolution: "1m", "1h", "1d" or "auto" (the finest resolution that
+        yields at most max_points buckets for the range).
+        """
+        if resolution == "auto":
+            span = max(end - start, 1)
+            resolution = next(
+                (name for name, secs in RESOLUTIONS.items() if span / secs <= max_points),
+                "1d"
+            )
+        secs = RESOLUTIONS[resolution]
+
+        return self.query(
+            """
+            SELECT bucket, min, max, sum / count AS mean, count
+              FROM rollups
+             WHERE devaddr = ? AND metric = ? AND resolution = ?
+               AND bucket >= ? AND bucket < ?
+             ORDER BY bucket
+            """,
+            (devaddr, metric, secs, start - start % secs, end)
+        )
+
+    def query_samples(self, devaddr: str, metric: str, start: int, end: int) -> list:
+        """Returns raw [{ts, value}, ...] samples for start <= ts < end."""
+        return self.query(
+            """
+            SELECT ts, value FROM samples
+             WHERE devaddr = ? AND metric = ? AND ts >= ? AND ts < ?
+             ORDER BY ts
+            """,
+            (devaddr, metric, start, end)
+        )
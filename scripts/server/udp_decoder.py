@@ -7,24 +7,40 @@ Defines LoRaEvent, a class that represents a decoded LoRaWAN event.
 Responsibilities:
 - Parse base64 rxpk from Semtech UDP JSON
 - Extract and decrypt LoRaWAN fields using AppSKey
-- Decode binary payload using Protocol maps
-- Normalize into a dict for routing and logging
+- Decode binary payload using Protocol maps (single events or multi-event
+  frames; one uplink may carry several events)
+- Pass the FPort's species dictionary version to the decoder, so
+  dictionary-coded detections come back as ordinary avis_events
+- Normalize into dicts for routing and logging
 
 Limitations:
 - Uplink-only (ABP)
 - MIC field is parsed but not validated
-- Target is hardcoded as "web_ingestor" for now
+- Target is derived from the decoded event_type (see EVENT_TARGETS)
 
 Usage:
     event = LoRaEvent(rxpk, node_registry)
-    print(event.target)
-    print(event.to_dict())
+    for data in event.to_dicts():
+        print(data["target"], data)
 """
 
 import base64
 from datetime import datetime, timezone
 from lorawan_decryptor import decrypt_frmpayload
-from protocol import Protocol
+from protocol import Protocol, dictionary_version
+
+
+# Shared across packets: loading the JSON maps once, not per uplink
+_PROTOCOL = Protocol()
+
+
+# ─── Routing targets per decoded event_type ───────────────────────
+EVENT_TARGETS = {
+    "avis_event": "web_ingestor",
+    "weather_event": "weather",
+    "telemetry_event": "telemetry",
+    "dictionary_announce": "protocol",
+}
 
 
 class LoRaEvent:
@@ -38,6 +54,12 @@ class LoRaEvent:
         self.mic = self.raw[-4:].hex()
         self.signature = f"{self.devaddr}-{self.fcnt}-{self.frm_payload_hex}"
 
+        # ─── Link quality reported by the gateway ──────────────────
+        self.rssi = rxpk.get("rssi")
+        self.lsnr = rxpk.get("lsnr")
+        self.datr = rxpk.get("datr")
+        self.freq = rxpk.get("freq")
+
         # ─── Lookup AppSKey and decrypt payload ────────────────────
         self.appskey = node_registry.get(self.devaddr, {}).get("appskey")
         if not self.appskey:
@@ -53,28 +75,45 @@ class LoRaEvent:
         self.decrypted_hex = self.decrypted.hex().upper()
 
         # ─── Decode binary payload using Protocol maps ─────────────
-        proto = Protocol()
-        self.decoded = proto.decode(self.decrypted)
+        self.events = _PROTOCOL.decode_frame(
+            self.decrypted,
+            source=self.devaddr,
+            dictionary_version=dictionary_version(self.fport)
+        )
+
+        for decoded in self.events:
+            # ─── Timestamp (optional, from payload) ────────────────
+            if "timestamp" in decoded:
+                decoded["event_timestamp"] = datetime.utcfromtimestamp(
+                    decoded["timestamp"]
+                ).isoformat() + "Z"
+
+            # ─── Routing target from event type ────────────────────
+            decoded["target"] = EVENT_TARGETS.get(decoded.get("event_type"), "unrouted")
 
-        # ─── Timestamp (optional, from payload) ────────────────────
-        if "timestamp" in self.decoded:
-            self.decoded["event_timestamp"] = datetime.utcfromtimestamp(
-                self.decoded["timestamp"]
-            ).isoformat() + "Z"
+        self.decoded = self.events[0]
+        self.target = self.decoded["target"]
 
-        # ─── Explicit routing target override ──────────────────────
-        self.target = "web_ingestor"
-        self.decoded["target"] = self.target
+    def to_dicts(self):
+        """One dict per event carried by this uplink (frame_index set for frames)."""
+        received_at = datetime.now(timezone.utc).isoformat()
+        framed = len(self.events) > 1
+        return [
+            {
+                "received_at": received_at,
+                "devaddr": self.devaddr,
+                "fcnt": self.fcnt,
+                "fport": self.fport,
+                "encrypted_frm": self.frm_payload_hex,
+                "mic": self.mic,
+                "decrypted_hex": self.decrypted_hex,
+                "raw_signature": self.signature,
+                **({"frame_index": i} if framed else {}),
+                **decoded
+            }
+            for i, decoded in enumerate(self.events)
+        ]
 
     def to_dict(self):
-        return {
-            "received_at": datetime.now(timezone.utc).isoformat(),
-            "devaddr": self.devaddr,
-            "fcnt": self.fcnt,
-            "fport": self.fport,
-            "encrypted_frm": self.frm_payload_hex,
-            "mic": self.mic,
-            "decrypted_hex": self.decrypted_hex,
-            "raw_signature": self.signature,
-            **self.decoded
-        }
+        """The first (or only) event of this uplink."""
+        return self.to_dicts()[0]
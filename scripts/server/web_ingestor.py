@@ -57,6 +57,8 @@ def ingest_avis_event(event: dict):
         "confidence_level": event.get("confidence_bin"),
         "time_stamp": event.get("event_timestamp")
     }
+    if "count" in event:        # aggregated detection window from the node
+        payload["count"] = event["count"]
 
     try:
         resp = requests.post(INGEST_URL, json=payload, timeout=5)